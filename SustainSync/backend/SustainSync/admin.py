@@ -1,11 +1,36 @@
+from django import forms
 from django.contrib import admin
 from .models import Bill
 
 
+class BillAdminForm(forms.ModelForm):
+	class Meta:
+		model = Bill
+		fields = "__all__"
+
+	def clean(self):
+		"""Report a type/month clash as a form error.
+
+		bill_month is generated, so the form leaves uniq_bill_type_month out of
+		its own constraint validation and the clash would surface as an
+		IntegrityError on save.
+		"""
+		cleaned_data = super().clean()
+		bill_type = cleaned_data.get("bill_type")
+		bill_date = cleaned_data.get("bill_date")
+		if bill_type and bill_date:
+			clashes = Bill.objects.filter(bill_type=bill_type, bill_month=bill_date.replace(day=1))
+			if self.instance.pk is not None:
+				clashes = clashes.exclude(pk=self.instance.pk)
+			if clashes.exists():
+				self.add_error("bill_date", f"Another {bill_type} bill already exists for that month")
+		return cleaned_data
+
+
 @admin.register(Bill)
 class BillAdmin(admin.ModelAdmin):
+	form = BillAdminForm
 	list_display = ("bill_id", "bill_type", "bill_date", "provider", "city", "state", "cost")
 	search_fields = ("provider", "city", "state", "bill_id")
 	list_filter = ("bill_type", "provider", "state")
 	ordering = ("-bill_date",)
-
@@ -0,0 +1,63 @@
+"""Bulk writes of bills through PostgreSQL ``COPY``.
+
+Shared by the upload view and the ``import_bills`` script: both switch from
+``bulk_create`` to ``copy_upsert_bills`` once a write reaches
+``COPY_THRESHOLD`` rows on PostgreSQL.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+from io import StringIO
+from typing import Any
+
+from django.db import connection
+
+from .models import Bill
+
+# Writes with at least this many rows use PostgreSQL COPY instead of the ORM.
+COPY_THRESHOLD = int(os.environ.get('SUSTAINSYNC_COPY_THRESHOLD', '5000'))
+
+
+def _copy_rows_csv(raw_cursor, copy_sql: str, fields: list[str], rows: dict[int, dict[str, Any]]) -> None:
+    """Stream rows through psycopg2's ``copy_expert`` as CSV text."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    for bill_id, defaults in rows.items():
+        writer.writerow([bill_id, *(defaults[name] for name in fields[1:])])
+    buffer.seek(0)
+    raw_cursor.copy_expert(f"{copy_sql} WITH (FORMAT csv)", buffer)
+
+
+def copy_upsert_bills(rows: dict[int, dict[str, Any]], update_fields: list[str]) -> None:
+    """Upsert rows through a staging table loaded with PostgreSQL ``COPY``.
+
+    ``rows`` maps bill_id to a dict holding every name in ``update_fields``.
+    COPY streams every row in one protocol message, then a single
+    ``INSERT ... ON CONFLICT`` merges the staging table into the bills table.
+    Must run inside a transaction because the staging table drops on commit;
+    it may be called several times within one.
+    """
+    quote = connection.ops.quote_name
+    table = quote(Bill._meta.db_table)
+    fields = ['bill_id', *update_fields]
+    columns = ', '.join(quote(Bill._meta.get_field(name).column) for name in fields)
+    assignments = ', '.join(
+        f"{quote(Bill._meta.get_field(name).column)} = EXCLUDED.{quote(Bill._meta.get_field(name).column)}"
+        for name in update_fields
+    )
+    copy_sql = f"COPY bill_upload_staging ({columns}) FROM STDIN"
+
+    with connection.cursor() as cursor:
+        # A caller may COPY several groups in one transaction, and ON COMMIT DROP
+        # only drops the previous staging table at commit.
+        cursor.execute("DROP TABLE IF EXISTS pg_temp.bill_upload_staging")
+        cursor.execute(
+            f"CREATE TEMP TABLE bill_upload_staging (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        _copy_rows_csv(cursor.cursor, copy_sql, fields, rows)
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM bill_upload_staging "
+            f"ON CONFLICT ({quote(Bill._meta.pk.column)}) DO UPDATE SET {assignments}"
+        )
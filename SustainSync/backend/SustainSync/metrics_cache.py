@@ -0,0 +1,53 @@
+"""Cache for dashboard aggregations, stored in Django's cache framework.
+
+Entries are namespaced by a generation token that ``invalidate_all`` replaces,
+so one write drops every cached aggregation without tracking keys. With the
+default per-process LocMemCache this behaves like an in-process cache; point
+``CACHES`` at a shared backend (e.g. Redis) and invalidation reaches every
+worker.
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+from typing import Any, Callable
+
+from django.core.cache import cache
+
+METRICS_CACHE_TTL_SECONDS = float(os.environ.get('METRICS_CACHE_TTL_SECONDS', '60'))
+
+_GENERATION_KEY = 'ss:metrics:generation'
+_MISSING = object()
+
+
+def _generation() -> str:
+    generation = cache.get(_GENERATION_KEY)
+    if generation is None:
+        cache.add(_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(_GENERATION_KEY)
+    return generation
+
+
+def get_or_compute(key: str, fn: Callable[[], Any], ttl: float | None = None) -> Any:
+    """Return the cached value for ``key`` or compute and store it with ``fn``."""
+    ttl = METRICS_CACHE_TTL_SECONDS if ttl is None else ttl
+    cache_key = f'ss:metrics:{_generation()}:{key}'
+    value = cache.get(cache_key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    value = fn()
+    if ttl > 0:
+        cache.set(cache_key, value, timeout=ttl)
+    return value
+
+
+def invalidate_all() -> None:
+    """Drop every cached aggregation; call after bills are written."""
+    cache.set(_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def version() -> str:
+    """Identifier that changes whenever ``invalidate_all`` runs."""
+    return _generation()
@@ -0,0 +1,54 @@
+from django.db import migrations, models
+
+
+CREATE_VIEW_SQL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS bill_monthly_totals AS
+SELECT date_trunc('month', bill_date)::date AS month,
+       SUM(cost) AS total_cost,
+       SUM(consumption) AS total_consumption
+FROM "SustainSync_bill"
+WHERE bill_date IS NOT NULL
+GROUP BY 1
+"""
+
+CREATE_INDEX_SQL = "CREATE UNIQUE INDEX IF NOT EXISTS bill_monthly_totals_month ON bill_monthly_totals (month)"
+
+DROP_VIEW_SQL = "DROP MATERIALIZED VIEW IF EXISTS bill_monthly_totals"
+
+
+def create_view(apps, schema_editor):
+    # Materialized views are PostgreSQL-specific; other backends aggregate on the fly.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_VIEW_SQL)
+    schema_editor.execute(CREATE_INDEX_SQL)
+
+
+def drop_view(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_VIEW_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SustainSync', '0006_sustainabilitygoal_analysis_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillMonthlyTotals',
+            fields=[
+                ('month', models.DateField(primary_key=True, serialize=False)),
+                ('total_cost', models.DecimalField(decimal_places=2, max_digits=14, null=True)),
+                ('total_consumption', models.DecimalField(decimal_places=2, max_digits=16, null=True)),
+            ],
+            options={
+                'db_table': 'bill_monthly_totals',
+                'ordering': ['month'],
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_view, drop_view),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.7 on 2026-10-15 22:36
+
+from django.db import migrations, models
+
+
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION sustainsync_bill_type_aggregate() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE "SustainSync_billtypeaggregate"
+        SET total_cost = total_cost - COALESCE(OLD.cost, 0),
+            total_consumption = total_consumption - COALESCE(OLD.consumption, 0),
+            bill_count = bill_count - 1,
+            billed_count = billed_count - (OLD.cost IS NOT NULL)::int
+        WHERE bill_type = OLD.bill_type;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO "SustainSync_billtypeaggregate" AS agg
+            (bill_type, total_cost, total_consumption, bill_count, billed_count)
+        VALUES (NEW.bill_type, COALESCE(NEW.cost, 0), COALESCE(NEW.consumption, 0), 1,
+                (NEW.cost IS NOT NULL)::int)
+        ON CONFLICT (bill_type) DO UPDATE
+        SET total_cost = agg.total_cost + EXCLUDED.total_cost,
+            total_consumption = agg.total_consumption + EXCLUDED.total_consumption,
+            bill_count = agg.bill_count + 1,
+            billed_count = agg.billed_count + EXCLUDED.billed_count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER sustainsync_bill_type_aggregate
+AFTER INSERT OR UPDATE OR DELETE ON "SustainSync_bill"
+FOR EACH ROW EXECUTE FUNCTION sustainsync_bill_type_aggregate();
+"""
+
+BACKFILL_SQL = """
+INSERT INTO "SustainSync_billtypeaggregate"
+    (bill_type, total_cost, total_consumption, bill_count, billed_count)
+SELECT bill_type, COALESCE(SUM(cost), 0), COALESCE(SUM(consumption), 0), COUNT(*), COUNT(cost)
+FROM "SustainSync_bill"
+GROUP BY bill_type
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS sustainsync_bill_type_aggregate ON "SustainSync_bill";
+DROP FUNCTION IF EXISTS sustainsync_bill_type_aggregate();
+"""
+
+
+def create_trigger(apps, schema_editor):
+    # Trigger maintenance is PostgreSQL-specific; other backends aggregate on the fly.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_TRIGGER_SQL)
+    schema_editor.execute(BACKFILL_SQL)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_TRIGGER_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SustainSync', '0007_bill_monthly_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillTypeAggregate',
+            fields=[
+                ('bill_type', models.CharField(choices=[('Power', 'Power'), ('Gas', 'Gas'), ('Water', 'Water')], max_length=20, primary_key=True, serialize=False)),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_consumption', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('bill_count', models.IntegerField(default=0)),
+                ('billed_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Bill Type Aggregate',
+                'verbose_name_plural': 'Bill Type Aggregates',
+                'ordering': ['bill_type'],
+            },
+        ),
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-15 22:41
+
+import SustainSync.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SustainSync', '0008_billtypeaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='bill_month',
+            field=models.GeneratedField(db_persist=True, expression=SustainSync.models.MonthStart('bill_date'), output_field=models.DateField(null=True)),
+        ),
+    ]
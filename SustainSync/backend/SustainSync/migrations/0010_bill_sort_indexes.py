@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-15 22:50
+
+from django.db import migrations
+
+
+# list_bills sorts with NULLS LAST in both directions, which a plain btree
+# only serves for ascending scans; these PostgreSQL indexes cover the
+# default descending sorts.
+SORT_INDEXES = {
+    'idx_bill_date_desc_nl': '(bill_date DESC NULLS LAST, bill_id DESC)',
+    'idx_bill_upload_desc_nl': '(timestamp_upload DESC NULLS LAST, bill_id DESC)',
+}
+
+
+def create_sort_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, columns in SORT_INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON "SustainSync_bill" {columns}')
+
+
+def drop_sort_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in SORT_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SustainSync', '0009_bill_bill_month'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_sort_indexes, drop_sort_indexes),
+    ]
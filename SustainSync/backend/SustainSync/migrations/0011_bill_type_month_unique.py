@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-15 22:54
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def delete_month_duplicates(apps, schema_editor):
+    """Keep the newest upload per type/month, as cleanup_duplicates.py does, so the constraint applies.
+
+    On PostgreSQL the ``bill_monthly_totals`` view is refreshed afterwards so
+    it stops counting the deleted bills.
+    """
+    Bill = apps.get_model('SustainSync', 'Bill')
+    bills = Bill.objects.using(schema_editor.connection.alias).filter(bill_month__isnull=False)
+    seen = set()
+    stale = []
+    ordered = bills.order_by(
+        'bill_type', 'bill_month', F('timestamp_upload').desc(nulls_last=True), '-bill_id'
+    ).values_list('bill_id', 'bill_type', 'bill_month')
+    for bill_id, bill_type, bill_month in ordered.iterator():
+        if (bill_type, bill_month) in seen:
+            stale.append(bill_id)
+        else:
+            seen.add((bill_type, bill_month))
+    if not stale:
+        return
+    bills.filter(bill_id__in=stale).delete()
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("REFRESH MATERIALIZED VIEW bill_monthly_totals")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SustainSync', '0010_bill_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_month_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='bill',
+            constraint=models.UniqueConstraint(fields=('bill_type', 'bill_month'), name='uniq_bill_type_month'),
+        ),
+    ]
@@ -1,6 +1,26 @@
 from django.db import models
 
 
+class MonthStart(models.Func):
+	"""First day of a date's month, as an immutable expression usable in a generated column.
+
+	``TruncMonth`` compiles to ``DATE_TRUNC('month', date)`` on PostgreSQL, which
+	resolves to the stable ``timestamptz`` overload, and to a Python function on
+	SQLite; neither is allowed in a stored generated column.
+	"""
+
+	arity = 1
+	output_field = models.DateField()
+
+	def as_postgresql(self, compiler, connection, **extra_context):
+		return self.as_sql(
+			compiler, connection, template="DATE_TRUNC('month', %(expressions)s::timestamp)::date", **extra_context
+		)
+
+	def as_sqlite(self, compiler, connection, **extra_context):
+		return self.as_sql(compiler, connection, template="DATE(%(expressions)s, 'start of month')", **extra_context)
+
+
 # Model representing a utility bill (electricity, gas, water)
 class Bill(models.Model):
 	BILL_TYPE_POWER = "Power"
@@ -23,6 +43,12 @@ class Bill(models.Model):
 	# invoice/bill date (typically the month start in the CSV)
 	bill_date = models.DateField(null=True, blank=True)
 
+	# first day of bill_date's month, computed by the database so monthly rollups and the
+	# type/month constraint group on a plain column that can never drift from bill_date
+	bill_month = models.GeneratedField(
+		expression=MonthStart("bill_date"), output_field=models.DateField(null=True), db_persist=True
+	)
+
 	# Units of measure limited to values present in the CSV
 	UNITS_KWH = "kWh"
 	UNITS_THERMS = "therms"
@@ -66,12 +92,66 @@ class Bill(models.Model):
 			models.Index(fields=["bill_date"]),
 			models.Index(fields=["provider"]),
 			models.Index(fields=["city", "state"]),
+			# The descending list sorts and MAX(timestamp_upload) use the
+			# PostgreSQL-only NULLS LAST indexes created in migration 0010.
+		]
+		constraints = [
+			# At most one bill per type and month; its unique index also serves
+			# the type/month lookups done by upload de-duplication.
+			models.UniqueConstraint(fields=["bill_type", "bill_month"], name="uniq_bill_type_month"),
 		]
 
 	def __str__(self):
 		return f"{self.bill_type} bill {self.bill_id} ({self.bill_date})"
 
 
+class BillMonthlyTotals(models.Model):
+	"""Read-only view over the ``bill_monthly_totals`` materialized view (PostgreSQL only)."""
+
+	month = models.DateField(primary_key=True)
+	total_cost = models.DecimalField(max_digits=14, decimal_places=2, null=True)
+	total_consumption = models.DecimalField(max_digits=16, decimal_places=2, null=True)
+
+	class Meta:
+		managed = False
+		db_table = "bill_monthly_totals"
+		ordering = ["month"]
+
+	@classmethod
+	def refresh(cls, using="default"):
+		"""Recompute the materialized view after bills change."""
+		from django.db import connections
+
+		connection = connections[using]
+		if connection.vendor != "postgresql":
+			return
+		with connection.cursor() as cursor:
+			cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {cls._meta.db_table}")
+
+
+class BillTypeAggregate(models.Model):
+	"""Running per-type totals kept in sync with Bill by a PostgreSQL trigger.
+
+	See migration 0008; on other backends the table stays empty and the
+	dashboard aggregates Bill directly.
+	"""
+
+	bill_type = models.CharField(max_length=20, primary_key=True, choices=Bill.BILL_TYPE_CHOICES)
+	total_cost = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+	total_consumption = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+	bill_count = models.IntegerField(default=0)
+	# bills with a non-null cost, the denominator for the average bill
+	billed_count = models.IntegerField(default=0)
+
+	class Meta:
+		verbose_name = "Bill Type Aggregate"
+		verbose_name_plural = "Bill Type Aggregates"
+		ordering = ["bill_type"]
+
+	def __str__(self):
+		return f"{self.bill_type} totals ({self.bill_count} bills)"
+
+
 class SustainabilityGoal(models.Model):
 	"""Model representing custom sustainability goals set by the user."""
 	
@@ -0,0 +1,34 @@
+"""HTTP response helpers for the SustainSync API."""
+
+from decimal import Decimal
+
+import orjson
+from django.http import HttpResponse, StreamingHttpResponse
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _orjson_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class OrjsonResponse(HttpResponse):
+    """Drop-in ``JsonResponse`` replacement serialised with orjson."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(orjson.dumps(data, default=_orjson_default, option=_ORJSON_OPTIONS), **kwargs)
+
+
+class NdjsonStreamingResponse(StreamingHttpResponse):
+    """Stream an iterable of objects as newline-delimited JSON."""
+
+    def __init__(self, items, **kwargs):
+        kwargs.setdefault('content_type', 'application/x-ndjson')
+        lines = (
+            orjson.dumps(item, default=_orjson_default, option=_ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+            for item in items
+        )
+        super().__init__(lines, **kwargs)
@@ -0,0 +1,99 @@
+"""Background execution for slow requests (LLM calls and CSV uploads).
+
+Jobs run on small in-process thread pools so the request thread can return
+immediately with a job id. Finished results are kept per cache key, letting
+repeated requests for the same inputs share one computed answer.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from django.db import close_old_connections
+
+LLM_WORKERS = int(os.environ.get('LLM_WORKERS', '2'))
+# Uploads get their own pool so they never wait behind LLM calls; a single
+# worker also keeps concurrent uploads from contending on the same rows.
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', '1'))
+# Finished jobs kept around for polling before the oldest are forgotten.
+MAX_FINISHED_JOBS = 256
+# Cached results kept per key before the oldest are evicted.
+MAX_CACHED_RESULTS = 128
+
+_executors = {
+    'llm': ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix='llm-job'),
+    'upload': ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='upload-job'),
+}
+_lock = threading.Lock()
+_jobs: dict[str, Future] = {}
+_pending_by_key: dict[str, str] = {}
+_results: dict[str, tuple[Any, int]] = {}
+
+
+def _default_cacheable(payload: Any, status: int) -> bool:
+    return status == 200
+
+
+def _run(key: str, fn: Callable[[], tuple[Any, int]], cacheable: Callable[[Any, int], bool]) -> tuple[Any, int]:
+    close_old_connections()
+    try:
+        payload, status = fn()
+    except Exception as exc:
+        payload, status = {'error': str(exc)}, 500
+    finally:
+        close_old_connections()
+    with _lock:
+        if cacheable(payload, status):
+            _results.pop(key, None)
+            _results[key] = (payload, status)
+            while len(_results) > MAX_CACHED_RESULTS:
+                del _results[next(iter(_results))]
+        _pending_by_key.pop(key, None)
+    return payload, status
+
+
+def cached_result(key: str) -> tuple[Any, int] | None:
+    """Return the last successful ``(payload, status)`` stored for ``key``."""
+    with _lock:
+        return _results.get(key)
+
+
+def submit(
+    key: str,
+    fn: Callable[[], tuple[Any, int]],
+    cacheable: Callable[[Any, int], bool] | None = None,
+    queue: str = 'llm',
+) -> str:
+    """Queue ``fn`` unless a job for ``key`` is already running; return its job id.
+
+    ``fn`` returns ``(payload, status)``. Results accepted by ``cacheable``
+    (default: HTTP 200) are stored for ``cached_result``. ``queue`` picks the
+    worker pool (``'llm'`` or ``'upload'``).
+    """
+    with _lock:
+        job_id = _pending_by_key.get(key)
+        if job_id is not None:
+            return job_id
+        finished = [jid for jid, future in _jobs.items() if future.done()]
+        for stale in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del _jobs[stale]
+        job_id = uuid.uuid4().hex
+        _pending_by_key[key] = job_id
+        _jobs[job_id] = _executors[queue].submit(_run, key, fn, cacheable or _default_cacheable)
+    return job_id
+
+
+def job_result(job_id: str) -> tuple[Any, int] | None:
+    """Return ``(payload, status)`` for a finished job, ``None`` while running.
+
+    Raises ``KeyError`` for unknown job ids.
+    """
+    with _lock:
+        future = _jobs[job_id]
+    if not future.done():
+        return None
+    return future.result()
@@ -1,3 +1,522 @@
-from django.test import TestCase
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import types
+import uuid
+from datetime import date, datetime, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import cleanup_duplicates
+import import_bills
+from llm.qcache import SemanticCache
+
+from . import bulk, tasks, views
+from .models import Bill, BillMonthlyTotals
+
+CSV_HEADER = 'bill_id,bill_type,bill_date,units_of_measure,consumption,cost\n'
+
+
+class UploadBillsTests(TestCase):
+    def _run_inline(self, key, fn, cacheable=None, queue='llm'):
+        self.job_payload, self.job_status = fn()
+        return 'inline-job'
+
+    def upload(self, body, header=CSV_HEADER):
+        """POST a CSV and run the queued ingest job on the test thread."""
+        upload = SimpleUploadedFile('bills.csv', (header + body).encode('utf-8'), content_type='text/csv')
+        with mock.patch.object(tasks, 'submit', side_effect=self._run_inline):
+            response = self.client.post(reverse('upload_bills'), {'file': upload})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.job_status, 200)
+        return self.job_payload
+
+    def test_invalid_rows_are_reported_by_csv_line(self):
+        payload = self.upload(
+            '1,Power,2024-01-15,kWh,100,12.50\n'
+            '2,Steam,2024-02-15,kWh,100,12.50\n'
+            ',Power,2024-03-15,kWh,100,12.50\n'
+            '4,Power,not-a-date,kWh,100,12.50\n'
+            '5,Power,2024-05-15,kWh,abc,12.50\n'
+        )
+        self.assertEqual(payload['inserted'], 1)
+        self.assertEqual(payload['status'], 'completed_with_errors')
+        self.assertEqual([issue['row'] for issue in payload['errors']], [3, 4, 5, 6])
+        self.assertEqual(payload['errors'][1]['message'], 'bill_id is required')
+        self.assertEqual(list(Bill.objects.values_list('bill_id', flat=True)), [1])
+
+    def test_trailing_comma_on_first_row_is_accepted(self):
+        payload = self.upload(
+            '1,Power,2024-01-15,kWh,100,12.50,\n'
+            '2,Gas,2024-01-15,therms,40,30.00\n'
+        )
+        self.assertEqual(payload['errors'], [])
+        self.assertEqual(payload['inserted'], 2)
+        self.assertEqual(Bill.objects.get(bill_id=1).bill_type, 'Power')
+
+    def test_row_with_extra_fields_only_rejects_that_row(self):
+        payload = self.upload(
+            '1,Power,2024-01-15,kWh,100,12.50\n'
+            '2,Gas,2024-01-15,therms,40,30.00,surprise\n'
+            '3,Water,2024-01-15,gallons,900,18.00\n'
+        )
+        self.assertEqual(payload['inserted'], 2)
+        self.assertEqual(payload['errors'], [
+            {'row': 3, 'message': 'Row has 7 fields but the header has 6'},
+        ])
+        self.assertFalse(Bill.objects.filter(bill_id=2).exists())
+
+    def test_out_of_range_numbers_only_reject_their_rows(self):
+        payload = self.upload(
+            '1,Power,2024-01-15,kWh,100,inf\n'
+            '2,Power,2024-02-15,kWh,nan,12.50\n'
+            '3,Power,2024-03-15,kWh,100,"$12,345,678,901.00"\n'
+            '4,Power,2024-04-15,kWh,100.004,"$1,234.567"\n'
+        )
+        self.assertEqual(payload['inserted'], 1)
+        self.assertEqual([issue['row'] for issue in payload['errors']], [2, 3, 4])
+        self.assertEqual(
+            payload['errors'][2]['message'],
+            "Field 'cost' must have at most 10 digits before the decimal point",
+        )
+        bill = Bill.objects.get(bill_id=4)
+        self.assertEqual(str(bill.cost), '1234.57')
+        self.assertEqual(str(bill.consumption), '100.00')
+
+    def test_values_too_long_for_their_column_are_row_errors(self):
+        payload = self.upload(
+            '1,Power,2024-01-15,kWh,100,12.50,Tennessee\n'
+            '2,Power,2024-02-15,kWh,100,12.50,GA\n'
+            '3,Power,2024-03-15,kWh,100,12.50,GA\n',
+            header=CSV_HEADER.rstrip('\n') + ',state\n',
+        )
+        self.assertEqual(payload['inserted'], 2)
+        self.assertEqual(payload['errors'], [
+            {'row': 2, 'message': "Field 'state' must be at most 8 characters"},
+        ])
+
+    def test_failed_copy_falls_back_to_batched_writes(self):
+        with mock.patch.object(bulk, 'COPY_THRESHOLD', 1), \
+                mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch.object(bulk, 'copy_upsert_bills', side_effect=DatabaseError('boom')) as copy, \
+                mock.patch.object(BillMonthlyTotals, 'refresh'):
+            payload = self.upload(
+                '1,Power,2024-01-15,kWh,100,12.50\n'
+                '2,Gas,2024-01-15,therms,40,30.00\n'
+            )
+        copy.assert_called_once()
+        self.assertEqual(payload['inserted'], 2)
+        self.assertEqual(payload['errors'], [])
+        self.assertEqual(Bill.objects.count(), 2)
+
+    def test_newest_row_wins_each_type_and_month(self):
+        Bill.objects.create(bill_id=10, bill_type='Power', bill_date=date(2024, 1, 3), cost='9.00')
+        payload = self.upload(
+            '1,Power,2024-01-15,kWh,100,12.50\n'
+            '2,Power,2024-01-20,kWh,120,15.00\n'
+            '3,Gas,2024-01-20,therms,40,30.00\n'
+        )
+        self.assertEqual(payload['errors'], [])
+        self.assertEqual(
+            sorted(Bill.objects.values_list('bill_type', 'bill_id')),
+            [('Gas', 3), ('Power', 2)],
+        )
+
+
+class CopyUpsertTests(SimpleTestCase):
+    def test_staging_table_is_replaced_on_each_call_in_a_transaction(self):
+        fake = mock.MagicMock()
+        fake.ops.quote_name = connection.ops.quote_name
+        cursor = fake.cursor.return_value.__enter__.return_value
+        with mock.patch.object(bulk, 'connection', fake):
+            bulk.copy_upsert_bills({1: {'bill_type': 'Power'}}, ['bill_type'])
+            bulk.copy_upsert_bills({2: {'bill_type': 'Gas'}}, ['bill_type'])
+        statements = [call.args[0].split(' (')[0] for call in cursor.execute.call_args_list]
+        self.assertEqual(statements, [
+            'DROP TABLE IF EXISTS pg_temp.bill_upload_staging',
+            'CREATE TEMP TABLE bill_upload_staging',
+            'INSERT INTO "SustainSync_bill"',
+        ] * 2)
+        self.assertEqual(cursor.cursor.copy_expert.call_count, 2)
+
+
+class RagModuleTests(SimpleTestCase):
+    def test_failed_import_is_retried(self):
+        fake_rag = types.ModuleType('llm.rag')
+        with mock.patch.object(views, '_ragmod', None), \
+                mock.patch.dict(sys.modules, {'llm.rag': None}):
+            with self.assertRaises(ImportError):
+                views._rag_module()
+            sys.modules['llm.rag'] = fake_rag
+            self.assertIs(views._rag_module(), fake_rag)
+
+
+class JobLifecycleTests(TestCase):
+    def wait(self, job_id):
+        tasks._jobs[job_id].result(timeout=5)
+
+    def status(self, job_id):
+        return self.client.get(reverse('job_status', args=[job_id]))
+
+    def test_job_is_pending_until_its_result_is_ready(self):
+        key = f'test:{uuid.uuid4().hex}'
+        release = threading.Event()
+
+        def work():
+            release.wait(5)
+            return {'answer': 42}, 200
+
+        job_id = tasks.submit(key, work)
+        self.assertEqual(tasks.submit(key, work), job_id)
+        pending = self.status(job_id)
+        self.assertEqual(pending.status_code, 202)
+        self.assertEqual(pending.json(), {'job_id': job_id, 'status': 'pending'})
+
+        release.set()
+        self.wait(job_id)
+        done = self.status(job_id)
+        self.assertEqual(done.status_code, 200)
+        self.assertEqual(done.json(), {'answer': 42})
+        self.assertEqual(tasks.cached_result(key), ({'answer': 42}, 200))
+
+    def test_failed_job_reports_its_error(self):
+        def work():
+            raise RuntimeError('model crashed')
+
+        key = f'test:{uuid.uuid4().hex}'
+        job_id = tasks.submit(key, work)
+        self.wait(job_id)
+        response = self.status(job_id)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {'error': 'model crashed'})
+        self.assertIsNone(tasks.cached_result(key))
+
+    def test_unknown_job_is_404(self):
+        self.assertEqual(self.status('does-not-exist').status_code, 404)
+
+    def test_forecast_is_queued_and_polled(self):
+        with mock.patch.object(views, '_rag_module', side_effect=ImportError('faiss missing')):
+            response = self.client.get(reverse('forecast_api'), {'summaries': 'false'})
+            self.assertEqual(response.status_code, 202)
+            job = response.json()
+            self.assertEqual(job['status'], 'pending')
+            self.assertEqual(job['status_url'], reverse('job_status', args=[job['job_id']]))
+            self.wait(job['job_id'])
+        result = self.client.get(job['status_url'])
+        self.assertEqual(result.status_code, 503)
+        self.assertEqual(result.json(), {'error': 'RAG not available in container: faiss missing'})
+
+
+class ListBillsTests(TestCase):
+    def setUp(self):
+        for month in range(1, 8):
+            Bill.objects.create(
+                bill_id=month, bill_type='Power' if month % 2 else 'Gas',
+                bill_date=date(2024, month, 1), cost=month,
+            )
+
+    def list(self, **params):
+        response = self.client.get(reverse('list_bills'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_page_and_total_come_from_one_query(self):
+        with self.assertNumQueries(1):
+            payload = self.list(page=2, page_size=3)
+        self.assertEqual(payload['count'], 7)
+        self.assertEqual(payload['total_pages'], 3)
+        self.assertFalse(payload['count_estimated'])
+        self.assertEqual([bill['bill_id'] for bill in payload['results']], [4, 3, 2])
+
+    def test_filtered_total(self):
+        payload = self.list(bill_type='Gas', page_size=2, page=2)
+        self.assertEqual(payload['count'], 3)
+        self.assertEqual([bill['bill_id'] for bill in payload['results']], [2])
+
+    def test_page_past_the_end_is_clamped_to_the_last_page(self):
+        payload = self.list(page=9, page_size=3)
+        self.assertEqual(payload['page'], 3)
+        self.assertEqual(payload['count'], 7)
+        self.assertEqual([bill['bill_id'] for bill in payload['results']], [1])
+
+    def test_page_size_is_clamped(self):
+        payload = self.list(page=0, page_size=500)
+        self.assertEqual((payload['page'], payload['page_size']), (1, 100))
+        self.assertEqual(len(payload['results']), 7)
+
+    def test_empty_listing(self):
+        payload = self.list(bill_type='Water', page=4)
+        self.assertEqual((payload['count'], payload['total_pages'], payload['results']), (0, 0, []))
+
+    def test_stream_exports_every_matching_bill_as_ndjson(self):
+        response = self.client.get(reverse('list_bills'), {'stream': 'true', 'bill_type': 'Gas', 'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        bills = [json.loads(line) for line in lines]
+        self.assertEqual([bill['bill_id'] for bill in bills], [6, 4, 2])
+        self.assertEqual(bills[0]['bill_date'], '2024-06-01')
+        self.assertEqual(bills[0]['cost'], 6.0)
+
+    def test_large_table_pages_against_the_estimate(self):
+        with mock.patch.object(views, '_estimated_bill_count', return_value=7), \
+                mock.patch.object(views, 'COUNT_ESTIMATE_THRESHOLD', 5):
+            payload = self.list(page=9, page_size=3)
+        self.assertTrue(payload['count_estimated'])
+        self.assertEqual(payload['page'], 3)
+        self.assertEqual([bill['bill_id'] for bill in payload['results']], [1])
+
+
+class SemanticCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = SemanticCache(threshold=0.9)
+        self.cache.put('What did water cost in March 2023?', [1.0, 0.0], 'water-2023-03', 'v1')
+
+    def test_rephrased_question_with_same_scope_hits(self):
+        self.assertEqual(
+            self.cache.get('water cost for march 2023', [0.99, 0.05], 'v1'),
+            'water-2023-03',
+        )
+
+    def test_different_year_month_or_utility_misses(self):
+        for question in (
+            'What did water cost in March 2024?',
+            'What did water cost in April 2023?',
+            'What did gas cost in March 2023?',
+        ):
+            with self.subTest(question=question):
+                self.assertIsNone(self.cache.get(question, [1.0, 0.0], 'v1'))
+
+    def test_new_data_version_misses(self):
+        self.assertIsNone(self.cache.get('What did water cost in March 2023?', [1.0, 0.0], 'v2'))
+
+
+class BillDataEtagTests(TestCase):
+    def setUp(self):
+        Bill.objects.create(bill_id=1, bill_type='Power', bill_date=date(2024, 1, 15), cost='12.50')
+
+    def test_unchanged_data_revalidates_with_304(self):
+        url = reverse('dashboard_metrics')
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        tag = first['ETag']
+
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], tag)
+
+        patched = self.client.patch(
+            reverse('update_bill', args=[1]), data='{"cost": "20.00"}', content_type='application/json',
+        )
+        self.assertEqual(patched.status_code, 200)
+        third = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third['ETag'], tag)
+
+    def test_tag_depends_on_query_string(self):
+        url = reverse('monthly_trends')
+        tag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url + '?months=3', HTTP_IF_NONE_MATCH=tag).status_code, 200)
+
+
+class MonthlyTrendsTests(TestCase):
+    def setUp(self):
+        for month in range(1, 8):
+            Bill.objects.create(bill_id=month, bill_type='Power', bill_date=date(2024, month, 20), cost=month)
+
+    def months(self, **params):
+        response = self.client.get(reverse('monthly_trends'), params)
+        self.assertEqual(response.status_code, 200)
+        return [point['month'] for point in response.json()['series']]
+
+    def test_since_starts_at_its_month(self):
+        self.assertEqual(self.months(since='2024-05-31'), ['2024-05-01', '2024-06-01', '2024-07-01'])
+
+    def test_months_counts_back_from_the_current_month(self):
+        with mock.patch.object(views.timezone, 'now', return_value=datetime(2024, 7, 3, tzinfo=timezone.utc)):
+            self.assertEqual(self.months(months=2), ['2024-06-01', '2024-07-01'])
+            self.assertEqual(self.months(months=0), ['2024-07-01'])
+
+    def test_invalid_window_is_rejected(self):
+        for params in ({'since': 'last spring'}, {'months': 'six'}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('monthly_trends'), params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+
+class UpdateBillTests(TestCase):
+    def setUp(self):
+        Bill.objects.create(bill_id=1, bill_type='Power', bill_date=date(2024, 1, 15), cost='12.50')
+        Bill.objects.create(bill_id=2, bill_type='Power', bill_date=date(2024, 2, 15), cost='14.00')
+
+    def patch(self, bill_id, payload):
+        return self.client.patch(
+            reverse('update_bill', args=[bill_id]), data=payload, content_type='application/json',
+        )
+
+    def test_monthly_totals_refresh_only_when_aggregated_fields_change(self):
+        with mock.patch.object(BillMonthlyTotals, 'refresh') as refresh:
+            self.assertEqual(self.patch(1, {'provider': 'Duluth Utilities', 'cost': '12.50'}).status_code, 200)
+            refresh.assert_not_called()
+            self.assertEqual(self.patch(1, {'cost': '13.00'}).status_code, 200)
+            refresh.assert_called_once()
+
+    def test_moving_a_bill_onto_a_taken_month_conflicts(self):
+        response = self.patch(2, {'bill_date': '2024-01-28'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'error': 'Another Power bill already exists for that month'})
+        self.assertEqual(Bill.objects.get(bill_id=2).bill_date, date(2024, 2, 15))
+
+
+class DataVersionTests(TestCase):
+    def setUp(self):
+        Bill.objects.create(bill_id=1, bill_type='Power', bill_date=date(2024, 1, 15), cost='12.50')
+
+    def test_bill_edit_changes_the_llm_cache_key_without_scanning_bills(self):
+        with self.assertNumQueries(1):
+            before = views._data_version()
+        response = self.client.patch(
+            reverse('update_bill', args=[1]), data={'cost': '99.00'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(views._data_version(), before)
+
+
+class BillAdminTests(TestCase):
+    def setUp(self):
+        Bill.objects.create(bill_id=1, bill_type='Power', bill_date=date(2024, 1, 15))
+        Bill.objects.create(bill_id=2, bill_type='Power', bill_date=date(2024, 2, 15))
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw'))
+
+    def change(self, bill_id, bill_date):
+        return self.client.post(reverse('admin:SustainSync_bill_change', args=[bill_id]), {
+            'bill_id': bill_id, 'bill_type': 'Power', 'bill_date': bill_date,
+        })
+
+    def test_moving_a_bill_onto_a_taken_month_is_a_form_error(self):
+        response = self.change(2, '2024-01-28')
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response.context['adminform'].form, 'bill_date', 'Another Power bill already exists for that month',
+        )
+        self.assertEqual(Bill.objects.get(bill_id=2).bill_date, date(2024, 2, 15))
+
+    def test_moving_a_bill_within_its_own_month_saves(self):
+        self.assertEqual(self.change(2, '2024-02-28').status_code, 302)
+        self.assertEqual(Bill.objects.get(bill_id=2).bill_date, date(2024, 2, 28))
+
+
+class ImportBillsTests(TestCase):
+    HEADER = 'bill_id,bill_type,timestamp_upload,bill_date,units_of_measure,consumption,cost\n'
+
+    def run_import(self, body):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as handle:
+            handle.write(self.HEADER + body)
+        self.addCleanup(os.remove, handle.name)
+        return import_bills.import_bills(handle.name, batch_size=2)
+
+    def stored(self):
+        return sorted(Bill.objects.values_list('bill_id', 'bill_type', 'bill_month'))
+
+    def test_newest_upload_wins_within_file_and_against_stored_bills(self):
+        Bill.objects.create(
+            bill_id=1, bill_type='Power', bill_date=date(2024, 1, 5),
+            timestamp_upload=datetime(2024, 2, 1, tzinfo=timezone.utc),
+        )
+        count = self.run_import(
+            '2,Power,2024-01-01 00:00:00,2024-01-10,kWh,100,10.00\n'
+            '3,Power,2024-03-01 00:00:00,2024-02-10,kWh,100,10.00\n'
+            '4,Power,2024-03-02 00:00:00,2024-02-11,kWh,100,10.00\n'
+            '5,Gas,,,therms,40,30.00\n'
+            '3,Power,2024-03-05 00:00:00,2024-03-10,kWh,100,10.00\n'
+        )
+        self.assertEqual(count, 3)
+        self.assertEqual(self.stored(), [
+            (1, 'Power', date(2024, 1, 1)),
+            (3, 'Power', date(2024, 3, 1)),
+            (4, 'Power', date(2024, 2, 1)),
+            (5, 'Gas', None),
+        ])
+
+    def test_bill_moved_to_another_month_frees_its_old_month(self):
+        Bill.objects.create(bill_id=1, bill_type='Power', bill_date=date(2024, 1, 5))
+        Bill.objects.create(bill_id=2, bill_type='Power', bill_date=date(2024, 2, 5))
+        self.run_import(
+            '3,Power,2024-04-01 00:00:00,2024-01-20,kWh,100,10.00\n'
+            '1,Power,2024-04-01 00:00:00,2024-02-20,kWh,100,10.00\n'
+            '2,Power,2024-04-01 00:00:00,2024-03-20,kWh,100,10.00\n'
+        )
+        self.assertEqual(self.stored(), [
+            (1, 'Power', date(2024, 2, 1)),
+            (2, 'Power', date(2024, 3, 1)),
+            (3, 'Power', date(2024, 1, 1)),
+        ])
+
+    def test_blank_lines_are_skipped(self):
+        count = self.run_import(
+            '\n'
+            '1,Power,2024-04-01 00:00:00,2024-01-20,kWh,100,10.00\n'
+            '\n'
+            '2,Gas,2024-04-01 00:00:00,2024-01-20,therms,40,30.00\n'
+            '1,Power,2024-04-02 00:00:00,2024-02-20,kWh,100,10.00\n'
+            '\n'
+        )
+        self.assertEqual(count, 2)
+        self.assertEqual(self.stored(), [
+            (1, 'Power', date(2024, 2, 1)),
+            (2, 'Gas', date(2024, 1, 1)),
+        ])
+
+
+class CleanupDuplicatesTests(TransactionTestCase):
+    def setUp(self):
+        # uniq_bill_type_month keeps duplicates out of a migrated database, so
+        # lift it to recreate the legacy data the script cleans up. SQLite
+        # rebuilds the table from Meta.constraints, so hide it there too.
+        constraint = next(c for c in Bill._meta.constraints if c.name == 'uniq_bill_type_month')
+        others = [c for c in Bill._meta.constraints if c is not constraint]
+        with mock.patch.object(Bill._meta, 'constraints', others), connection.schema_editor() as editor:
+            editor.remove_constraint(Bill, constraint)
+        self.addCleanup(self.restore_constraint, constraint)
+
+    def restore_constraint(self, constraint):
+        Bill.objects.all().delete()
+        with connection.schema_editor() as editor:
+            editor.add_constraint(Bill, constraint)
+
+    def test_keeps_the_newest_upload_per_type_and_month_in_one_statement(self):
+        uploaded = lambda day: datetime(2024, 3, day, tzinfo=timezone.utc)
+        for bill_id, bill_type, bill_date, timestamp in (
+            (1, 'Power', date(2024, 1, 5), uploaded(1)),
+            (2, 'Power', date(2024, 1, 20), uploaded(2)),
+            (3, 'Power', date(2024, 1, 25), None),
+            (4, 'Power', date(2024, 2, 5), uploaded(1)),
+            (5, 'Gas', date(2024, 1, 5), None),
+            (6, 'Gas', date(2024, 1, 6), None),
+            (7, 'Water', None, None),
+            (8, 'Water', None, None),
+        ):
+            Bill.objects.create(bill_id=bill_id, bill_type=bill_type, bill_date=bill_date, timestamp_upload=timestamp)
+
+        with CaptureQueriesContext(connection) as queries, contextlib.redirect_stdout(io.StringIO()) as output:
+            deleted = cleanup_duplicates.cleanup_duplicate_bills()
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(len([q for q in queries if q['sql'].lstrip().startswith('DELETE')]), 1)
+        self.assertEqual(sorted(Bill.objects.values_list('bill_id', flat=True)), [2, 4, 6, 7, 8])
+        self.assertIn('Removed 3 duplicate bill(s)', output.getvalue())
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(cleanup_duplicates.cleanup_duplicate_bills(), 0)
@@ -3,51 +3,107 @@
 from __future__ import annotations
 
 import csv
+import hashlib
 import json
-from datetime import datetime
+import os
+import re
+import uuid
+import warnings
+from datetime import date, datetime
+from functools import wraps
 from decimal import Decimal, InvalidOperation
 from io import TextIOWrapper
 
-from django.db.models import Avg, Sum, F
+import pandas as pd
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Count, Max, Min, Sum, F, Q, Window
 from django.db.models.expressions import OrderBy
-from django.db.models.functions import TruncMonth, Coalesce
-from django.http import HttpResponse, JsonResponse
+from django.db.models.functions import Coalesce
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
 from django.utils import timezone
 from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags, quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-from .models import Bill, SustainabilityGoal
+from . import bulk, metrics_cache, tasks
+from .models import Bill, BillMonthlyTotals, BillTypeAggregate, SustainabilityGoal
+from .responses import NdjsonStreamingResponse, OrjsonResponse
+
+# Currency symbols, thousands separators and whitespace stripped from numeric CSV fields.
+_CURRENCY_CHARS_RE = re.compile(r'[\s$,]')
+
+# Rows per INSERT/UPDATE statement when persisting CSV uploads.
+BULK_BATCH_SIZE = int(os.environ.get('SUSTAINSYNC_BULK_BATCH_SIZE', '1000'))
+
+# Uploads larger than this are rejected before any parsing.
+MAX_UPLOAD_BYTES = int(os.environ.get('SUSTAINSYNC_MAX_UPLOAD_BYTES', str(25 * 1024 * 1024)))
+
+# Default for forecast's ?summaries= flag.
+ENABLE_LLM_SUMMARIES = os.environ.get('ENABLE_LLM_SUMMARIES', 'true').lower() in ('true', '1', 'yes')
+
+# Rows fetched per round trip when iterating large querysets.
+QUERY_CHUNK_SIZE = 2000
+
+# count_bills returns the pg_class estimate once the table is at least this large.
+COUNT_ESTIMATE_THRESHOLD = int(os.environ.get('SUSTAINSYNC_COUNT_ESTIMATE_THRESHOLD', '100000'))
+
+BILL_UPSERT_FIELDS = [
+    'bill_type', 'bill_date', 'service_start', 'service_end', 'units_of_measure',
+    'consumption', 'cost', 'provider', 'city', 'state', 'zip', 'timestamp_upload',
+]
+
+ALLOWED_BILL_TYPES = frozenset(choice[0] for choice in Bill.BILL_TYPE_CHOICES)
+ALLOWED_UNITS = frozenset(choice[0] for choice in Bill.UNITS_OF_MEASURE_CHOICES)
+BILL_TYPE_ERROR = f"bill_type must be one of: {', '.join(sorted(ALLOWED_BILL_TYPES))}"
+UNITS_ERROR = f"units_of_measure must be one of: {', '.join(sorted(ALLOWED_UNITS))}"
 
 
 def _to_float(value):
-    if value is None:
-        return 0.0
-    if isinstance(value, Decimal):
-        return float(value)
-    return float(value)
+    return 0.0 if value is None else float(value)
+
+
+def _iso(value):
+    return value.isoformat() if value else None
 
 
 def _build_metrics_snapshot():
-    metrics = Bill.objects.aggregate(
-        total_cost=Sum('cost'),
-        total_consumption=Sum('consumption'),
-        average_bill=Avg('cost'),
-    )
-    latest_bill = Bill.objects.order_by('-bill_date').first()
+    return metrics_cache.get_or_compute('metrics_snapshot', _compute_metrics_snapshot)
 
-    breakdown = (
-        Bill.objects.values('bill_type')
-        .annotate(total_cost=Sum('cost'), total_consumption=Sum('consumption'))
-        .order_by('bill_type')
-    )
+
+def _compute_metrics_snapshot():
+    last_updated = Bill.objects.aggregate(last=Max('bill_date'))['last']
+    if connection.vendor == 'postgresql':
+        # Per-type totals are maintained by a trigger on the bills table.
+        breakdown = list(
+            BillTypeAggregate.objects.filter(bill_count__gt=0)
+            .values('bill_type', 'total_cost', 'total_consumption', 'billed_count')
+            .order_by('bill_type')
+        )
+    else:
+        breakdown = list(
+            Bill.objects.values('bill_type')
+            .annotate(
+                total_cost=Sum('cost'),
+                total_consumption=Sum('consumption'),
+                billed_count=Count('cost'),
+            )
+            .order_by('bill_type')
+        )
+
+    # Derive portfolio totals from the per-type rows instead of re-scanning.
+    total_cost = sum(_to_float(entry['total_cost']) for entry in breakdown)
+    total_consumption = sum(_to_float(entry['total_consumption']) for entry in breakdown)
+    billed_count = sum(entry['billed_count'] for entry in breakdown)
 
     return {
         'totals': {
-            'cost': _to_float(metrics.get('total_cost')),
-            'consumption': _to_float(metrics.get('total_consumption')),
-            'average_bill': _to_float(metrics.get('average_bill')),
-            'last_updated': latest_bill.bill_date.isoformat() if latest_bill and latest_bill.bill_date else None,
+            'cost': total_cost,
+            'consumption': total_consumption,
+            'average_bill': total_cost / billed_count if billed_count else 0.0,
+            'last_updated': _iso(last_updated),
         },
         'by_type': [
             {
@@ -60,34 +116,45 @@ def _build_metrics_snapshot():
     }
 
 
-def _build_monthly_series():
-    series = (
-        Bill.objects.exclude(bill_date__isnull=True)
-        .annotate(month=TruncMonth('bill_date'))
-        .values('month')
-        .annotate(total_cost=Sum('cost'), total_consumption=Sum('consumption'))
-        .order_by('month')
+def _build_monthly_series(since=None):
+    return metrics_cache.get_or_compute(
+        f'monthly_series:{since}', lambda: _compute_monthly_series(since)
     )
 
-    result = []
-    for item in series:
-        month_val = None
-        m = item.get('month')
-        if m:
-            # TruncMonth may return a datetime or a date depending on DB/driver.
-            # Safely handle either by checking for .date().
-            if hasattr(m, 'date'):
-                month_val = m.date().isoformat()
-            else:
-                month_val = m.isoformat()
 
-        result.append({
-            'month': month_val,
+def _compute_monthly_series(since=None):
+    return list(_iter_monthly_series(since))
+
+
+def _iter_monthly_series(since=None):
+    """Yield monthly totals, streaming rows from the database in chunks.
+
+    ``since`` (a month-start date) limits the series to that month onwards.
+    """
+    if connection.vendor == 'postgresql':
+        # Served from the bill_monthly_totals materialized view (refreshed on write).
+        series = BillMonthlyTotals.objects.values('month', 'total_cost', 'total_consumption')
+        if since is not None:
+            series = series.filter(month__gte=since)
+    else:
+        # Group on the generated bill_month column instead of truncating bill_date per row.
+        bills = Bill.objects.exclude(bill_month__isnull=True)
+        if since is not None:
+            bills = bills.filter(bill_month__gte=since)
+        series = (
+            bills
+            .values(month=F('bill_month'))
+            .annotate(total_cost=Sum('cost'), total_consumption=Sum('consumption'))
+            .order_by('month')
+        )
+
+    for item in series.iterator(chunk_size=QUERY_CHUNK_SIZE):
+        month = item['month']
+        yield {
+            'month': _iso(month),
             'total_cost': _to_float(item['total_cost']),
             'total_consumption': _to_float(item['total_consumption']),
-        })
-
-    return result
+        }
 
 
 def _fallback_recommendations():
@@ -114,116 +181,232 @@ def _fallback_recommendations():
     return "\n".join(f"• {msg}" for msg in messages)
 
 
+def _data_version():
+    """Fingerprint of bills and goals, used to key cached LLM results.
+
+    Bills are represented by ``metrics_cache.version()``, which every bill
+    write path bumps, so no query touches the bills table; the goals table is
+    small enough to aggregate directly.
+    """
+    goals = SustainabilityGoal.objects.aggregate(last=Max('updated_at'), total=Count('id'))
+    return f"{metrics_cache.version()}|{goals['last']}|{goals['total']}"
+
+
+def _queued_response(key, fn, cacheable=None, queue='llm'):
+    """Serve a cached result for ``key`` or queue ``fn`` and return 202."""
+    cached = tasks.cached_result(key)
+    if cached is not None:
+        payload, status = cached
+        return OrjsonResponse(payload, status=status)
+
+    job_id = tasks.submit(key, fn, cacheable=cacheable, queue=queue)
+    return OrjsonResponse({
+        'job_id': job_id,
+        'status': 'pending',
+        'status_url': reverse('job_status', args=[job_id]),
+    }, status=202)
+
+
+@require_http_methods(["GET"])
+def job_status(request, job_id):
+    """Poll a queued job; 202 while running, the job's response once done."""
+    try:
+        result = tasks.job_result(job_id)
+    except KeyError:
+        return OrjsonResponse({'error': 'Job not found'}, status=404)
+    if result is None:
+        return OrjsonResponse({'job_id': job_id, 'status': 'pending'}, status=202)
+    payload, status = result
+    return OrjsonResponse(payload, status=status)
+
+
+_ragmod = None
+
+
+def _rag_module():
+    """Import ``llm.rag`` on first use and reuse it once the import succeeds.
+
+    The import stays lazy because it loads sentence-transformers and FAISS.
+    Failures are not remembered, so a dependency that was still starting up
+    is picked up by the next call.
+    """
+    global _ragmod
+    if _ragmod is None:
+        from llm import rag as ragmod
+        _ragmod = ragmod
+    return _ragmod
+
+
+def _answer_question(question, version):
+    try:
+        ragmod = _rag_module()
+    except Exception as exc:  # pragma: no cover - optional dependency
+        return {'error': f'RAG not available in container: {exc}'}, 503
+
+    try:
+        return {'answer': ragmod.run_query(question, cache_version=version)}, 200
+    except Exception as exc:
+        return {'error': str(exc)}, 500
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def ask_rag(request):
     try:
         payload = json.loads(request.body)
     except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON payload'}, status=400)
+        return OrjsonResponse({'error': 'Invalid JSON payload'}, status=400)
 
     question = payload.get('question', '').strip()
     if not question:
-        return JsonResponse({'error': 'No question provided'}, status=400)
-
-    try:
-        from llm import rag as ragmod
-    except Exception as exc:  # pragma: no cover - optional dependency
-        return JsonResponse({'error': f'RAG not available in container: {exc}'}, status=503)
+        return OrjsonResponse({'error': 'No question provided'}, status=400)
+
+    version = _data_version()
+    key = f"ask:{question}:{version}"
+    return _queued_response(key, lambda: _answer_question(question, version))
+
+
+def _bill_data_etag(view):
+    """Tag read-only bill responses with an ETag and answer 304 when unchanged.
+
+    The tag combines ``metrics_cache.version()`` with the latest upload
+    timestamp (an index-only ``MAX``, no table count). With the default
+    per-process LocMemCache the version only changes for writes made by this
+    process; writes from elsewhere (for example ``import_bills.py``) change
+    the tag only through a newer ``timestamp_upload``, so edits and deletes
+    they make stay invisible until a shared cache backend is configured.
+    Clients must revalidate on every request, which keeps the dashboard
+    fresh right after an upload.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        last_upload = Bill.objects.aggregate(last_upload=Max('timestamp_upload'))['last_upload']
+        fingerprint = f"{metrics_cache.version()}|{last_upload}|{request.get_full_path()}"
+        tag = quote_etag(hashlib.md5(fingerprint.encode(), usedforsecurity=False).hexdigest())
+
+        if tag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = tag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
-    try:
-        answer = ragmod.run_query(question)
-        return JsonResponse({'answer': answer})
-    except Exception as exc:
-        return JsonResponse({'error': str(exc)}, status=500)
+    return wrapper
 
 
 @require_http_methods(["GET"])
+@_bill_data_etag
 def dashboard_metrics(request):
     try:
-        return JsonResponse(_build_metrics_snapshot())
+        return OrjsonResponse(_build_metrics_snapshot())
     except Exception as exc:
-        return JsonResponse({'error': str(exc)}, status=500)
+        return OrjsonResponse({'error': str(exc)}, status=500)
 
 
 @require_http_methods(["GET"])
+@_bill_data_etag
 def monthly_trends(request):
+    """Monthly totals; ``?since=YYYY-MM-DD`` or ``?months=N`` trims the window."""
     try:
-        return JsonResponse({'series': _build_monthly_series()})
+        since = None
+        if request.GET.get('since'):
+            since = _parse_date(request.GET['since'], 'since').replace(day=1)
+        elif request.GET.get('months'):
+            months = max(1, int(request.GET['months']))
+            today = timezone.now().date()
+            month_index = today.year * 12 + today.month - 1 - (months - 1)
+            since = date(month_index // 12, month_index % 12 + 1, 1)
+    except ValueError as exc:
+        return OrjsonResponse({'error': str(exc)}, status=400)
+
+    try:
+        return OrjsonResponse({'series': _build_monthly_series(since)})
     except Exception as exc:
-        return JsonResponse({'error': str(exc)}, status=500)
+        return OrjsonResponse({'error': str(exc)}, status=500)
 
 
-@require_http_methods(["GET"])
-def forecast(request):
-    periods_param = request.GET.get('periods', '12')
-    try:
-        periods = max(1, min(24, int(periods_param)))
-    except ValueError:
-        periods = 12
-    
-    # Enable LLM summaries by default for AI-driven insights (can be disabled with summaries=false)
-    # Summaries may take 30-60 seconds depending on Ollama performance
-    import os
-    default_summaries = os.environ.get('ENABLE_LLM_SUMMARIES', 'true').lower() in ('true', '1', 'yes')
-    include_summaries = request.GET.get('summaries', str(default_summaries)).lower() in ('true', '1', 'yes')
-    
-    # Format parameter: 'dashboard' or 'sustainability' (default: 'dashboard')
-    # Dashboard: Key Trends, Cost Efficiency, Actionable Recommendations
-    # Sustainability: Goal-focused bullet list
-    format_param = request.GET.get('format', 'dashboard').lower()
-    use_dashboard_format = format_param == 'dashboard'
+def _goal_rows():
+    """The (at most five) sustainability goals as dicts, fetched in one query."""
+    return list(
+        SustainabilityGoal.objects.values('title', 'description', 'analysis_type', 'target_date')[:5]
+    )
+
 
+def _build_forecast(periods, include_summaries, use_dashboard_format):
     try:
-        from llm import rag as ragmod
+        ragmod = _rag_module()
     except Exception as exc:  # pragma: no cover - optional dependency
-        return JsonResponse({'error': f'RAG not available in container: {exc}'}, status=503)
+        return {'error': f'RAG not available in container: {exc}'}, 503
 
     # Fetch sustainability goals to incorporate into recommendations
     goals = None
     if include_summaries:
-        goals_qs = SustainabilityGoal.objects.all()[:5]
-        if goals_qs.exists():
-            goals = []
-            for g in goals_qs:
-                goal_dict = {
-                    'title': g.title,
-                    'description': g.description,
-                    'analysis_type': g.analysis_type,
-                    'target_date': g.target_date.strftime('%B %Y') if g.target_date else None
+        import logging
+        logger = logging.getLogger(__name__)
+        goal_rows = _goal_rows()
+        if goal_rows:
+            goals = [
+                {
+                    'title': g['title'],
+                    'description': g['description'],
+                    'analysis_type': g['analysis_type'],
+                    'target_date': g['target_date'].strftime('%B %Y') if g['target_date'] else None
                 }
-                goals.append(goal_dict)
-            import logging
-            logger = logging.getLogger(__name__)
+                for g in goal_rows
+            ]
             logger.info(f"Passing {len(goals)} sustainability goals to forecast: {[g['title'] for g in goals]}")
         else:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.info("No sustainability goals found in database")
 
     try:
         # The LLM helper now returns total plus per-utility forecasts and summaries.
         result = ragmod.run_forecast(periods=periods, include_summaries=include_summaries, goals=goals, use_dashboard_format=use_dashboard_format)
     except Exception as exc:
-        return JsonResponse({'error': str(exc)}, status=500)
+        return {'error': str(exc)}, 500
 
     status = 200 if not (isinstance(result, dict) and result.get('error')) else 500
-    return JsonResponse(result, status=status)
+    return result, status
 
 
 @require_http_methods(["GET"])
-def ai_recommendations(request):
-    custom_question = request.GET.get('question', '').strip()
+def forecast(request):
+    periods_param = request.GET.get('periods', '12')
+    try:
+        periods = max(1, min(24, int(periods_param)))
+    except ValueError:
+        periods = 12
+    
+    # Enable LLM summaries by default for AI-driven insights (can be disabled with summaries=false)
+    # Summaries may take 30-60 seconds depending on Ollama performance, so the
+    # work runs as a background job and the client polls job_status.
+    include_summaries = request.GET.get('summaries', str(ENABLE_LLM_SUMMARIES)).lower() in ('true', '1', 'yes')
     
+    # Format parameter: 'dashboard' or 'sustainability' (default: 'dashboard')
+    # Dashboard: Key Trends, Cost Efficiency, Actionable Recommendations
+    # Sustainability: Goal-focused bullet list
+    format_param = request.GET.get('format', 'dashboard').lower()
+    use_dashboard_format = format_param == 'dashboard'
+
+    key = f"forecast:{periods}:{include_summaries}:{use_dashboard_format}:{_data_version()}"
+    return _queued_response(
+        key, lambda: _build_forecast(periods, include_summaries, use_dashboard_format)
+    )
+
+
+def _build_recommendations(custom_question):
     # Get all sustainability goals (auto-analyze all of them)
-    goals = SustainabilityGoal.objects.all()[:5]
+    goal_rows = _goal_rows()
+    goals_count = len(goal_rows)
     goals_context = ""
-    if goals.exists():
+    if goal_rows:
         goals_list = []
-        for g in goals:
-            goal_str = f"- {g.title}: {g.description}"
-            if g.target_date:
-                goal_str += f" (Target: {g.target_date.strftime('%B %Y')})"
+        for g in goal_rows:
+            goal_str = f"- {g['title']}: {g['description']}"
+            if g['target_date']:
+                goal_str += f" (Target: {g['target_date'].strftime('%B %Y')})"
             goals_list.append(goal_str)
         goals_context = "\n\nUser's Sustainability Goals:\n" + "\n".join(goals_list) + "\n"
     
@@ -246,7 +429,7 @@ def ai_recommendations(request):
     )
 
     try:
-        from llm import rag as ragmod
+        ragmod = _rag_module()
         answer = ragmod.run_query(prompt)
         
         # Extract data sources from the RAG context
@@ -254,43 +437,58 @@ def ai_recommendations(request):
         data_sources = {
             'model': 'llama3.2:1b',
             'data_range': _get_data_range(),
-            'goals_count': goals.count(),
+            'goals_count': goals_count,
             'rag_enabled': True
         }
         
-        return JsonResponse({
+        return {
             'recommendations': answer,
             'sources': data_sources,
-            'goals_count': goals.count()
-        })
+            'goals_count': goals_count
+        }, 200
     except Exception as exc:  # pragma: no cover - optional dependency
-        fallback = _fallback_recommendations()
-        data_sources = {
+        return _fallback_recommendations_payload(goals_count, warning=str(exc)), 200
+
+
+def _fallback_recommendations_payload(goals_count, warning=None):
+    payload = {
+        'recommendations': _fallback_recommendations(),
+        'sources': {
             'model': 'fallback',
             'data_range': _get_data_range(),
-            'goals_count': goals.count(),
+            'goals_count': goals_count,
             'rag_enabled': False
-        }
-        return JsonResponse({
-            'recommendations': fallback,
-            'sources': data_sources,
-            'goals_count': goals.count(),
-            'warning': str(exc)
-        })
+        },
+        'goals_count': goals_count,
+    }
+    if warning is not None:
+        payload['warning'] = warning
+    return payload
+
+
+@require_http_methods(["GET"])
+def ai_recommendations(request):
+    custom_question = request.GET.get('question', '').strip()
+    if not Bill.objects.exists():
+        # Nothing for the LLM to analyse yet; answer right away.
+        return OrjsonResponse(_fallback_recommendations_payload(SustainabilityGoal.objects.count()))
+    key = f"recommendations:{custom_question}:{_data_version()}"
+    # Fallback answers (LLM unreachable) are served but not cached.
+    return _queued_response(
+        key,
+        lambda: _build_recommendations(custom_question),
+        cacheable=lambda payload, status: status == 200 and 'warning' not in payload,
+    )
 
 
 def _get_data_range():
     """Get the date range of available billing data."""
-    first_bill = Bill.objects.order_by('bill_date').first()
-    last_bill = Bill.objects.order_by('-bill_date').first()
-    
-    if first_bill and last_bill:
-        return {
-            'start_date': first_bill.bill_date.isoformat() if first_bill.bill_date else None,
-            'end_date': last_bill.bill_date.isoformat() if last_bill.bill_date else None,
-            'total_bills': Bill.objects.count()
-        }
-    return {'start_date': None, 'end_date': None, 'total_bills': 0}
+    bounds = Bill.objects.aggregate(first=Min('bill_date'), last=Max('bill_date'), total=Count('pk'))
+    return {
+        'start_date': _iso(bounds['first']),
+        'end_date': _iso(bounds['last']),
+        'total_bills': bounds['total'],
+    }
 
 
 @require_http_methods(["GET", "POST", "PUT", "DELETE"])
@@ -304,9 +502,9 @@ def sustainability_goals(request):
         if goal_id:
             try:
                 goal = SustainabilityGoal.objects.get(id=goal_id)
-                return JsonResponse(_serialize_goal(goal))
+                return OrjsonResponse(_serialize_goal(goal))
             except SustainabilityGoal.DoesNotExist:
-                return JsonResponse({'error': 'Goal not found'}, status=404)
+                return OrjsonResponse({'error': 'Goal not found'}, status=404)
         
         # List all goals
         goals = SustainabilityGoal.objects.all()
@@ -315,7 +513,7 @@ def sustainability_goals(request):
         print(f"[DEBUG] Goals endpoint called - found {goals.count()} goals")
         print(f"[DEBUG] Goals data: {goals_list}")
         
-        return JsonResponse({
+        return OrjsonResponse({
             'goals': goals_list,
             'count': goals.count()
         })
@@ -327,16 +525,16 @@ def sustainability_goals(request):
             
             # Limit to 5 goals maximum
             if SustainabilityGoal.objects.count() >= 5:
-                return JsonResponse({'error': 'Maximum of 5 goals allowed'}, status=400)
+                return OrjsonResponse({'error': 'Maximum of 5 goals allowed'}, status=400)
             
             goal = SustainabilityGoal.objects.create(
                 title=data.get('title', ''),
                 description=data.get('description', ''),
                 target_date=parse_date(data['target_date']) if data.get('target_date') else None
             )
-            return JsonResponse(_serialize_goal(goal), status=201)
+            return OrjsonResponse(_serialize_goal(goal), status=201)
         except Exception as e:
-            return JsonResponse({'error': str(e)}, status=400)
+            return OrjsonResponse({'error': str(e)}, status=400)
     
     elif request.method == "PUT":
         # Update existing goal
@@ -344,7 +542,7 @@ def sustainability_goals(request):
             data = json.loads(request.body)
             goal_id = data.get('id')
             if not goal_id:
-                return JsonResponse({'error': 'Goal ID required'}, status=400)
+                return OrjsonResponse({'error': 'Goal ID required'}, status=400)
             
             goal = SustainabilityGoal.objects.get(id=goal_id)
             goal.title = data.get('title', goal.title)
@@ -353,11 +551,11 @@ def sustainability_goals(request):
                 goal.target_date = parse_date(data['target_date'])
             goal.save()
             
-            return JsonResponse(_serialize_goal(goal))
+            return OrjsonResponse(_serialize_goal(goal))
         except SustainabilityGoal.DoesNotExist:
-            return JsonResponse({'error': 'Goal not found'}, status=404)
+            return OrjsonResponse({'error': 'Goal not found'}, status=404)
         except Exception as e:
-            return JsonResponse({'error': str(e)}, status=400)
+            return OrjsonResponse({'error': str(e)}, status=400)
     
     elif request.method == "DELETE":
         # Delete goal
@@ -365,15 +563,15 @@ def sustainability_goals(request):
             data = json.loads(request.body)
             goal_id = data.get('id')
             if not goal_id:
-                return JsonResponse({'error': 'Goal ID required'}, status=400)
+                return OrjsonResponse({'error': 'Goal ID required'}, status=400)
             
             goal = SustainabilityGoal.objects.get(id=goal_id)
             goal.delete()
-            return JsonResponse({'success': True, 'message': 'Goal deleted'})
+            return OrjsonResponse({'success': True, 'message': 'Goal deleted'})
         except SustainabilityGoal.DoesNotExist:
-            return JsonResponse({'error': 'Goal not found'}, status=404)
+            return OrjsonResponse({'error': 'Goal not found'}, status=404)
         except Exception as e:
-            return JsonResponse({'error': str(e)}, status=400)
+            return OrjsonResponse({'error': str(e)}, status=400)
 
 
 def _serialize_goal(goal):
@@ -383,18 +581,54 @@ def _serialize_goal(goal):
         'title': goal.title,
         'description': goal.description,
         'analysis_type': goal.analysis_type,
-        'target_date': goal.target_date.isoformat() if goal.target_date else None,
+        'target_date': _iso(goal.target_date),
         'created_at': goal.created_at.isoformat(),
         'updated_at': goal.updated_at.isoformat()
     }
 
 
+def _estimated_bill_count():
+    """Planner row estimate from pg_class; ``None`` when unavailable."""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+            [Bill._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 until the table has been analyzed.
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
 @require_http_methods(["GET"])
+@_bill_data_etag
 def count_bills(request):
     try:
-        return JsonResponse({'count': Bill.objects.count()})
+        exact = request.GET.get('exact', '').lower() in ('true', '1', 'yes')
+        estimate = None if exact else _estimated_bill_count()
+        # Small tables are cheap to count exactly; only trust the estimate at scale.
+        if estimate is not None and estimate >= COUNT_ESTIMATE_THRESHOLD:
+            return OrjsonResponse({'count': estimate, 'estimated': True})
+
+        if connection.vendor == 'postgresql':
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("SET LOCAL statement_timeout = '2s'")
+                count = Bill.objects.count()
+        else:
+            count = Bill.objects.count()
+        return OrjsonResponse({'count': count, 'estimated': False})
     except Exception as exc:
-        return JsonResponse({'error': str(exc)}, status=500)
+        return OrjsonResponse({'error': str(exc)}, status=500)
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back for streaming."""
+
+    def write(self, value):
+        return value
 
 
 @require_http_methods(["GET"])
@@ -428,18 +662,17 @@ def download_template(request):
         '30096',
     ]
 
-    response = HttpResponse(content_type='text/csv')
+    writer = csv.writer(_Echo())
+    rows = (writer.writerow(row) for row in (headers, example_row))
+    response = StreamingHttpResponse(rows, content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="sustainsync_template.csv"'
-    writer = csv.writer(response)
-    writer.writerow(headers)
-    writer.writerow(example_row)
     return response
 
 
 def _parse_decimal(value: str | None, field_name: str):
     if value in (None, ''):
         return None
-    cleaned = value.replace('$', '').replace(',', '').strip()
+    cleaned = _CURRENCY_CHARS_RE.sub('', value)
     try:
         return Decimal(cleaned)
     except (InvalidOperation, ValueError) as exc:
@@ -480,9 +713,68 @@ def _parse_date(value: str | None, field_name: str):
     )
 
 
+BILL_LIST_FIELDS = (
+    'bill_id', 'bill_type', 'bill_date', 'service_start', 'service_end', 'units_of_measure',
+    'consumption', 'cost', 'provider', 'city', 'state', 'zip', 'timestamp_upload',
+)
+
+# Fields a PATCH to update_bill may change.
+BILL_EDITABLE_FIELDS = (
+    'bill_type', 'bill_date', 'service_start', 'service_end', 'units_of_measure',
+    'consumption', 'cost', 'provider', 'city', 'state', 'zip',
+)
+
+# Columns bill_monthly_totals aggregates; edits to anything else skip its refresh.
+MONTHLY_TOTALS_FIELDS = ('bill_date', 'consumption', 'cost')
+
+
+def _serialize_bill(row):
+    """Shape a bill, given as a ``values(*BILL_LIST_FIELDS)`` dict, for API responses."""
+    service_start = _iso(row['service_start'])
+    service_end = _iso(row['service_end'])
+    return {
+        'bill_id': row['bill_id'],
+        'bill_type': row['bill_type'],
+        'bill_date': _iso(row['bill_date']),
+        'service_start': service_start,
+        'service_end': service_end,
+        'service_period': f"{service_start or ''} - {service_end or ''}",
+        'units_of_measure': row['units_of_measure'],
+        'consumption': _to_float(row['consumption']),
+        'cost': _to_float(row['cost']),
+        'provider': row['provider'],
+        'city': row['city'],
+        'state': row['state'],
+        'zip': row['zip'],
+        'timestamp_upload': _iso(row['timestamp_upload']),
+    }
+
+
+# Sort keys accepted by list_bills; only the direction varies per request.
+BILL_ORDERING = {
+    'bill_date': (F('bill_date'),),
+    'timestamp_upload': (F('timestamp_upload'),),
+    'consumption': (F('consumption'),),
+    'cost': (F('cost'),),
+    'provider': (F('provider'), F('bill_date')),
+    'service_period': (
+        Coalesce(F('service_start'), F('service_end'), F('bill_date')),
+        Coalesce(F('service_end'), F('service_start'), F('bill_date')),
+    ),
+    'location': (F('city'), F('state'), F('zip'), F('bill_date')),
+}
+
+
+def _bill_page(queryset, page, page_size):
+    """Fetch one page of ``queryset`` as ``values()`` dicts, keeping annotations."""
+    start = (page - 1) * page_size
+    fields = (*BILL_LIST_FIELDS, *queryset.query.annotations)
+    return list(queryset.values(*fields)[start:start + page_size])
+
+
 @require_http_methods(["GET"])
 def list_bills(request):
-    """List and filter bills with pagination for the tables view."""
+    """List and filter bills with pagination for the tables view; ``?stream=true`` exports all as NDJSON."""
     try:
         bill_type = request.GET.get('bill_type')
         page = int(request.GET.get('page', '1'))
@@ -492,20 +784,7 @@ def list_bills(request):
 
         descending = sort_direction != 'asc'
 
-        ordering_map = {
-            'bill_date': [F('bill_date')],
-            'timestamp_upload': [F('timestamp_upload')],
-            'consumption': [F('consumption')],
-            'cost': [F('cost')],
-            'provider': [F('provider'), F('bill_date')],
-            'service_period': [
-                Coalesce(F('service_start'), F('service_end'), F('bill_date')),
-                Coalesce(F('service_end'), F('service_start'), F('bill_date')),
-            ],
-            'location': [F('city'), F('state'), F('zip'), F('bill_date')],
-        }
-
-        ordering_expressions = ordering_map.get(sort_by, ordering_map['bill_date'])
+        ordering_expressions = BILL_ORDERING.get(sort_by, BILL_ORDERING['bill_date'])
         order_by = [
             OrderBy(expr, descending=descending, nulls_last=True)
             for expr in ordering_expressions
@@ -523,41 +802,37 @@ def list_bills(request):
 
         queryset = queryset.order_by(*order_by)
 
-        total_count = queryset.count()
+        if request.GET.get('stream', '').lower() in ('true', '1', 'yes'):
+            # Export every matching bill as NDJSON, fetched in chunks.
+            rows = queryset.values(*BILL_LIST_FIELDS).iterator(chunk_size=QUERY_CHUNK_SIZE)
+            return NdjsonStreamingResponse(_serialize_bill(row) for row in rows)
+
+        # Unfiltered listings of a large table page against the planner estimate.
+        total_count = None if bill_type else _estimated_bill_count()
+        count_estimated = total_count is not None and total_count >= COUNT_ESTIMATE_THRESHOLD
+        if count_estimated:
+            page = min(page, max(1, (total_count + page_size - 1) // page_size))
+            rows = _bill_page(queryset, page, page_size)
+        else:
+            # COUNT(*) OVER () returns the filtered total with the page itself.
+            rows = _bill_page(queryset.annotate(total_rows=Window(Count('pk'))), page, page_size)
+            if rows:
+                total_count = rows[0]['total_rows']
+            else:
+                # Past the last page (or no rows): count, then clamp to the last page.
+                total_count = queryset.count()
+                last_page = (total_count + page_size - 1) // page_size
+                if last_page > 0 and page > last_page:
+                    page = last_page
+                    rows = _bill_page(queryset, page, page_size)
         total_pages = (total_count + page_size - 1) // page_size
-        if total_pages > 0 and page > total_pages:
-            page = total_pages
 
-        start = (page - 1) * page_size
-        end = start + page_size
-        bills = queryset[start:end]
+        results = [_serialize_bill(row) for row in rows]
 
-        results = [
-            {
-                'bill_id': bill.bill_id,
-                'bill_type': bill.bill_type,
-                'bill_date': bill.bill_date.isoformat() if bill.bill_date else None,
-                'service_start': bill.service_start.isoformat() if bill.service_start else None,
-                'service_end': bill.service_end.isoformat() if bill.service_end else None,
-                'service_period': (
-                    f"{bill.service_start.isoformat() if bill.service_start else ''} - "
-                    f"{bill.service_end.isoformat() if bill.service_end else ''}"
-                ),
-                'units_of_measure': bill.units_of_measure,
-                'consumption': _to_float(bill.consumption),
-                'cost': _to_float(bill.cost),
-                'provider': bill.provider,
-                'city': bill.city,
-                'state': bill.state,
-                'zip': bill.zip,
-                'timestamp_upload': bill.timestamp_upload.isoformat() if bill.timestamp_upload else None,
-            }
-            for bill in bills
-        ]
-
-        return JsonResponse({
+        return OrjsonResponse({
             'results': results,
             'count': total_count,
+            'count_estimated': count_estimated,
             'total_pages': total_pages,
             'page': page,
             'page_size': page_size,
@@ -565,7 +840,7 @@ def list_bills(request):
             'sort_direction': 'asc' if not descending else 'desc',
         })
     except Exception as exc:
-        return JsonResponse({'error': str(exc)}, status=500)
+        return OrjsonResponse({'error': str(exc)}, status=500)
 
 
 @csrf_exempt
@@ -573,23 +848,21 @@ def list_bills(request):
 def update_bill(request, bill_id):
     """Update a single bill record."""
     try:
-        bill = Bill.objects.get(bill_id=bill_id)
+        bill = Bill.objects.only(*BILL_LIST_FIELDS).get(bill_id=bill_id)
     except Bill.DoesNotExist:
-        return JsonResponse({'error': 'Bill not found'}, status=404)
+        return OrjsonResponse({'error': 'Bill not found'}, status=404)
 
     try:
         payload = json.loads(request.body)
     except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON payload'}, status=400)
-
-    allowed_types = {choice[0] for choice in Bill.BILL_TYPE_CHOICES}
-    allowed_units = {choice[0] for choice in Bill.UNITS_OF_MEASURE_CHOICES}
+        return OrjsonResponse({'error': 'Invalid JSON payload'}, status=400)
 
+    totals_before = [getattr(bill, name) for name in MONTHLY_TOTALS_FIELDS]
     try:
         if 'bill_type' in payload:
             bill_type = payload['bill_type'].strip()
-            if bill_type not in allowed_types:
-                raise ValueError(f"bill_type must be one of: {', '.join(sorted(allowed_types))}")
+            if bill_type not in ALLOWED_BILL_TYPES:
+                raise ValueError(BILL_TYPE_ERROR)
             bill.bill_type = bill_type
 
         if 'bill_date' in payload:
@@ -603,8 +876,8 @@ def update_bill(request, bill_id):
 
         if 'units_of_measure' in payload:
             units = payload['units_of_measure'].strip() if payload['units_of_measure'] else None
-            if units and units not in allowed_units:
-                raise ValueError(f"units_of_measure must be one of: {', '.join(sorted(allowed_units))}")
+            if units and units not in ALLOWED_UNITS:
+                raise ValueError(UNITS_ERROR)
             bill.units_of_measure = units
 
         if 'consumption' in payload:
@@ -626,121 +899,314 @@ def update_bill(request, bill_id):
         if 'zip' in payload:
             bill.zip = payload['zip'] or None
 
-        bill.save()
-
-        return JsonResponse({
-            'bill_id': bill.bill_id,
-            'bill_type': bill.bill_type,
-            'bill_date': bill.bill_date.isoformat() if bill.bill_date else None,
-            'service_start': bill.service_start.isoformat() if bill.service_start else None,
-            'service_end': bill.service_end.isoformat() if bill.service_end else None,
-            'units_of_measure': bill.units_of_measure,
-            'consumption': _to_float(bill.consumption),
-            'cost': _to_float(bill.cost),
-            'provider': bill.provider,
-            'city': bill.city,
-            'state': bill.state,
-            'zip': bill.zip,
-        })
+        changed = [name for name in BILL_EDITABLE_FIELDS if name in payload]
+        if changed:
+            with transaction.atomic():
+                bill.save(update_fields=changed)
+            if [getattr(bill, name) for name in MONTHLY_TOTALS_FIELDS] != totals_before:
+                BillMonthlyTotals.refresh()
+            metrics_cache.invalidate_all()
+
+        return OrjsonResponse(_serialize_bill({field: getattr(bill, field) for field in BILL_LIST_FIELDS}))
+    except IntegrityError:
+        return OrjsonResponse(
+            {'error': f'Another {bill.bill_type} bill already exists for that month'},
+            status=409,
+        )
     except Exception as exc:
-        return JsonResponse({'error': str(exc)}, status=400)
+        return OrjsonResponse({'error': str(exc)}, status=400)
 
 
-@csrf_exempt
-@require_http_methods(["POST"])
-def upload_bills(request):
-    upload = request.FILES.get('file')
-    if not upload:
-        return JsonResponse({'error': 'No file provided'}, status=400)
+def _read_bills_csv(stream):
+    """Read an uploaded CSV into a frame of strings plus per-row errors.
 
-    try:
-        wrapper = TextIOWrapper(upload.file, encoding='utf-8')
-    except Exception as exc:
-        return JsonResponse({'error': f'Unable to read uploaded file: {exc}'}, status=400)
+    Well-formed files go through pandas' C parser. A file with any row wider
+    than the header is re-read by ``_read_ragged_csv`` so each such row is
+    judged on its own instead of failing (or silently shifting) the file.
+    Returns ``(frame, row_errors)`` with errors keyed by data-row position.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', pd.errors.ParserWarning)
+        try:
+            frame = pd.read_csv(stream, dtype=str, keep_default_na=False, index_col=False)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame(), {}
+        except (pd.errors.ParserError, pd.errors.ParserWarning):
+            stream.seek(0)
+            return _read_ragged_csv(stream)
+    return frame.fillna(''), {}
+
+
+def _read_ragged_csv(stream):
+    """Row-by-row CSV read that tolerates rows wider than the header.
+
+    Extra fields that are all empty (a trailing comma) are dropped; a row
+    with extra values is kept in the frame but reported as an error.
+    """
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if not header:
+        return pd.DataFrame(), {}
+    width = len(header)
+    rows = []
+    row_errors = {}
+    for fields in reader:
+        if not fields:
+            continue  # blank line, skipped the same way read_csv skips it
+        if len(fields) > width and any(value.strip() for value in fields[width:]):
+            row_errors[len(rows)] = f'Row has {len(fields)} fields but the header has {width}'
+        rows.append(fields[:width] + [''] * (width - len(fields)))
+    return pd.DataFrame(rows, columns=header, dtype=str), row_errors
+
+
+def _parse_date_column(frame, column, errors):
+    """Vectorised ISO date parse, falling back to ``_parse_date`` for other formats."""
+    raw = frame[column]
+    parsed = pd.to_datetime(raw, format='%Y-%m-%d', errors='coerce')
+    values = [None if pd.isna(value) else value.date() for value in parsed]
+    for position in ((raw != '') & parsed.isna()).to_numpy().nonzero()[0]:
+        try:
+            values[position] = _parse_date(raw.iat[position], column)
+        except ValueError as exc:
+            errors.setdefault(position, str(exc))
+    return values
+
+
+def _parse_decimal_column(frame, column, errors):
+    """Parse a currency/number CSV column into ``Decimal`` values.
+
+    Values are rounded to the model field's ``decimal_places`` here and
+    checked against its ``max_digits``, so a non-finite or oversized value
+    rejects its own row instead of failing the batch that writes it.
+    """
+    field = Bill._meta.get_field(column)
+    quantum = Decimal(1).scaleb(-field.decimal_places)
+    limit = Decimal(10) ** (field.max_digits - field.decimal_places)
+    raw = frame[column]
+    cleaned = raw.str.replace(_CURRENCY_CHARS_RE, '', regex=True)
+    values = []
+    for position, (original, text) in enumerate(zip(raw, cleaned)):
+        if original == '':
+            values.append(None)
+            continue
+        try:
+            number = Decimal(text)
+        except InvalidOperation:
+            number = None
+        if number is None or not number.is_finite():
+            errors.setdefault(position, f"Field '{column}' must be numeric")
+            values.append(None)
+        elif abs(number) >= limit or abs(number.quantize(quantum)) >= limit:
+            errors.setdefault(
+                position,
+                f"Field '{column}' must have at most "
+                f"{field.max_digits - field.decimal_places} digits before the decimal point",
+            )
+            values.append(None)
+        else:
+            values.append(number.quantize(quantum))
+    return values
+
+
+def _parse_bills_frame(frame, row_errors=None):
+    """Validate an uploaded CSV frame column-by-column.
+
+    Returns ``(parsed, errors)`` where ``parsed`` is a list of
+    ``(row_number, bill_id, defaults)`` tuples in file order and ``errors`` reports the
+    first problem found on each rejected row. Rows are identified by their
+    position in the frame; ``row_errors`` seeds errors already found while
+    reading the file.
+    """
+    for column in ('service_start', 'service_end', 'provider', 'city', 'state', 'zip'):
+        if column not in frame.columns:
+            frame[column] = ''
+
+    row_errors = dict(row_errors or {})
+
+    bill_id_raw = frame['bill_id'].str.strip()
+    for position in (bill_id_raw == '').to_numpy().nonzero()[0]:
+        row_errors.setdefault(position, 'bill_id is required')
+    malformed = (bill_id_raw != '') & ~bill_id_raw.str.fullmatch(r'[+-]?\d+')
+    for position in malformed.to_numpy().nonzero()[0]:
+        row_errors.setdefault(
+            position, f"invalid literal for int() with base 10: '{frame['bill_id'].iat[position]}'"
+        )
 
-    reader = csv.DictReader(wrapper)
-    required_headers = {
-        'bill_id', 'bill_type', 'bill_date', 'units_of_measure', 'consumption', 'cost'
-    }
-    if not reader.fieldnames or required_headers - set(reader.fieldnames):
-        missing = required_headers - set(reader.fieldnames or [])
-        return JsonResponse({'error': f'Missing required columns: {", ".join(sorted(missing))}'}, status=400)
+    bill_types = frame['bill_type'].str.strip()
+    for position in (~bill_types.isin(ALLOWED_BILL_TYPES)).to_numpy().nonzero()[0]:
+        row_errors.setdefault(position, BILL_TYPE_ERROR)
+
+    units = frame['units_of_measure'].str.strip()
+    for position in ((units != '') & ~units.isin(ALLOWED_UNITS)).to_numpy().nonzero()[0]:
+        row_errors.setdefault(position, UNITS_ERROR)
+
+    for column in ('provider', 'city', 'state', 'zip'):
+        max_length = Bill._meta.get_field(column).max_length
+        for position in (frame[column].str.len() > max_length).to_numpy().nonzero()[0]:
+            row_errors.setdefault(position, f"Field '{column}' must be at most {max_length} characters")
+
+    bill_dates = _parse_date_column(frame, 'bill_date', row_errors)
+    service_starts = _parse_date_column(frame, 'service_start', row_errors)
+    service_ends = _parse_date_column(frame, 'service_end', row_errors)
+    consumptions = _parse_decimal_column(frame, 'consumption', row_errors)
+    costs = _parse_decimal_column(frame, 'cost', row_errors)
+
+    min_id, max_id = connection.ops.integer_field_range('IntegerField')
+    upload_ts = timezone.now()
+    parsed = []
+    columns = zip(
+        range(len(frame)), bill_id_raw, bill_types, units, bill_dates, service_starts, service_ends,
+        consumptions, costs, frame['provider'], frame['city'], frame['state'], frame['zip'],
+    )
+    for (position, bill_id, bill_type, unit, bill_date, service_start, service_end,
+         consumption, cost, provider, city, state, zip_code) in columns:
+        if position in row_errors:
+            continue
+        bill_id = int(bill_id)
+        if (min_id is not None and bill_id < min_id) or (max_id is not None and bill_id > max_id):
+            row_errors[position] = 'bill_id is out of range'
+            continue
+        parsed.append((position + 2, bill_id, {
+            'bill_type': bill_type,
+            'bill_date': bill_date,
+            'service_start': service_start,
+            'service_end': service_end,
+            'units_of_measure': unit or None,
+            'consumption': consumption,
+            'cost': cost,
+            'provider': provider or None,
+            'city': city or None,
+            'state': state or None,
+            'zip': zip_code or None,
+            'timestamp_upload': upload_ts,
+        }))
+
+    errors = [
+        {'row': position + 2, 'message': message}  # account for header row
+        for position, message in sorted(row_errors.items())
+    ]
+    return parsed, errors
 
-    allowed_types = {choice[0] for choice in Bill.BILL_TYPE_CHOICES}
-    allowed_units = {choice[0] for choice in Bill.UNITS_OF_MEASURE_CHOICES}
 
-    inserted = 0
-    updated = 0
-    errors = []
+def _month_key(defaults):
+    bill_date = defaults['bill_date']
+    if bill_date is None:
+        return None
+    return (defaults['bill_type'], bill_date.year, bill_date.month)
+
+
+def _collapse_parsed_rows(parsed):
+    """Apply the "newest upload wins" rule to parsed rows in file order.
+
+    A later row replaces an earlier row with the same bill_id, and also
+    supersedes any other row for the same bill_type and bill_date month.
+    Returns the surviving rows, the bill_id that owns each month and the
+    CSV row number each surviving bill came from.
+    """
+    rows = {}
+    month_owners = {}
+    source_rows = {}
+    for row_number, bill_id, defaults in parsed:
+        rows.pop(bill_id, None)
+        key = _month_key(defaults)
+        if key is not None:
+            previous = month_owners.get(key)
+            if previous is not None and previous != bill_id and previous in rows \
+                    and _month_key(rows[previous]) == key:
+                del rows[previous]
+            month_owners[key] = bill_id
+        rows[bill_id] = defaults
+        source_rows[bill_id] = row_number
+    return rows, month_owners, source_rows
+
+
+def _write_batches(write, bills, source_rows, errors):
+    """Run ``write`` over ``bills`` in batches, each inside its own savepoint.
+
+    A failing batch is rolled back on its own and reported against the CSV
+    rows it contained, so one bad batch does not discard the whole upload.
+    Returns the bills that were written.
+    """
+    written = []
+    for start in range(0, len(bills), BULK_BATCH_SIZE):
+        batch = bills[start:start + BULK_BATCH_SIZE]
+        try:
+            with transaction.atomic():
+                write(batch)
+        except DatabaseError as exc:
+            errors.extend(
+                {'row': source_rows[bill.bill_id], 'message': f'Not saved: {exc}'}
+                for bill in batch
+            )
+        else:
+            written.extend(batch)
+    return written
+
+
+def _persist_bills(rows, month_owners, source_rows, errors):
+    """Write collapsed upload rows with a bounded number of queries.
+
+    Older bills sharing a month/type with an uploaded row are removed in a
+    single DELETE, then rows are upserted in batches with
+    ``bulk_create(update_conflicts=True)``; one lookup of existing ids keeps
+    the inserted/updated counts accurate. Large uploads on
+    PostgreSQL go through ``COPY`` instead (see ``bulk.copy_upsert_bills``);
+    if the COPY fails its savepoint is rolled back and the rows are written
+    in batches. Batch failures are appended to ``errors``. Returns ``(inserted, updated)``.
+    """
+    deleted_count = 0
+    if month_owners:
+        duplicates = Q()
+        for (bill_type, year, month), owner_id in month_owners.items():
+            duplicates |= Q(
+                bill_type=bill_type,
+                bill_month=date(year, month, 1),
+            ) & ~Q(bill_id=owner_id)
+        deleted_count = Bill.objects.filter(duplicates).delete()[0]
+
+    existing_ids = set(
+        Bill.objects.filter(bill_id__in=list(rows)).values_list('bill_id', flat=True)
+    )
 
-    for idx, row in enumerate(reader, start=2):  # account for header row
+    if connection.vendor == 'postgresql' and len(rows) >= bulk.COPY_THRESHOLD:
         try:
-            bill_id_raw = row.get('bill_id')
-            if bill_id_raw in (None, ''):
-                raise ValueError('bill_id is required')
-            bill_id = int(bill_id_raw)
-
-            bill_type = row.get('bill_type', '').strip()
-            if bill_type not in allowed_types:
-                raise ValueError(f"bill_type must be one of: {', '.join(sorted(allowed_types))}")
-
-            units = row.get('units_of_measure', '').strip()
-            if units and units not in allowed_units:
-                raise ValueError(f"units_of_measure must be one of: {', '.join(sorted(allowed_units))}")
-
-            bill_date = _parse_date(row.get('bill_date'), 'bill_date')
-            service_start = _parse_date(row.get('service_start'), 'service_start')
-            service_end = _parse_date(row.get('service_end'), 'service_end')
-
-            consumption = _parse_decimal(row.get('consumption'), 'consumption')
-            cost = _parse_decimal(row.get('cost'), 'cost')
-
-            # Check for duplicate bills with same bill_date month/year and bill_type
-            # Delete older duplicates, keeping the newest upload
-            deleted_count = 0
-            if bill_date:
-                year = bill_date.year
-                month = bill_date.month
-                # Delete any existing bills for this month/year/type combination
-                deleted_count = Bill.objects.filter(
-                    bill_date__year=year,
-                    bill_date__month=month,
-                    bill_type=bill_type
-                ).exclude(bill_id=bill_id).delete()[0]
-            
-            if deleted_count > 0:
-                updated += deleted_count
-
-            defaults = {
-                'bill_type': bill_type,
-                'bill_date': bill_date,
-                'service_start': service_start,
-                'service_end': service_end,
-                'units_of_measure': units or None,
-                'consumption': consumption,
-                'cost': cost,
-                'provider': row.get('provider') or None,
-                'city': row.get('city') or None,
-                'state': row.get('state') or None,
-                'zip': row.get('zip') or None,
-                'timestamp_upload': timezone.now(),
-            }
+            with transaction.atomic():
+                bulk.copy_upsert_bills(rows, BILL_UPSERT_FIELDS)
+        except DatabaseError:
+            pass  # fall back to batches, which pin the failure on the rows that caused it
+        else:
+            updated = sum(1 for bill_id in rows if bill_id in existing_ids)
+            return len(rows) - updated, updated + deleted_count
+
+    bills = [Bill(bill_id=bill_id, **defaults) for bill_id, defaults in rows.items()]
+    written = _write_batches(
+        lambda batch: Bill.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['bill_id'],
+            update_fields=BILL_UPSERT_FIELDS,
+        ),
+        bills, source_rows, errors,
+    )
+    updated = sum(1 for bill in written if bill.bill_id in existing_ids)
 
-            _, created = Bill.objects.update_or_create(
-                bill_id=bill_id,
-                defaults=defaults,
-            )
+    return len(written) - updated, updated + deleted_count
 
-            if created:
-                inserted += 1
-            elif deleted_count == 0:
-                # Only count as updated if we didn't already count deleted records
-                updated += 1
-        except Exception as exc:
-            errors.append({'row': idx, 'message': str(exc)})
 
-    wrapper.detach()
+def _ingest_bills(frame, row_errors=None):
+    """Validate and store an uploaded bills frame; returns ``(payload, status)``."""
+    parsed, errors = _parse_bills_frame(frame, row_errors)
 
+    rows, month_owners, source_rows = _collapse_parsed_rows(parsed)
+    try:
+        with transaction.atomic():
+            inserted, updated = _persist_bills(rows, month_owners, source_rows, errors)
+            BillMonthlyTotals.refresh()
+        metrics_cache.invalidate_all()
+    except Exception as exc:
+        return {'error': f'Unable to save uploaded bills: {exc}'}, 500
+
+    errors.sort(key=lambda issue: issue['row'])
     response = {
         'inserted': inserted,
         'updated': updated,
@@ -751,4 +1217,45 @@ def upload_bills(request):
     else:
         response['status'] = 'success'
 
-    return JsonResponse(response)
+    return response, 200
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def upload_bills(request):
+    upload = request.FILES.get('file')
+    if not upload:
+        return OrjsonResponse({'error': 'No file provided'}, status=400)
+    if upload.size > MAX_UPLOAD_BYTES:
+        return OrjsonResponse(
+            {'error': f'File too large; the limit is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB'},
+            status=413,
+        )
+
+    try:
+        wrapper = TextIOWrapper(upload.file, encoding='utf-8')
+    except Exception as exc:
+        return OrjsonResponse({'error': f'Unable to read uploaded file: {exc}'}, status=400)
+
+    try:
+        frame, read_errors = _read_bills_csv(wrapper)
+    except Exception as exc:
+        wrapper.detach()
+        return OrjsonResponse({'error': f'Unable to parse uploaded file: {exc}'}, status=400)
+    wrapper.detach()
+
+    required_headers = {
+        'bill_id', 'bill_type', 'bill_date', 'units_of_measure', 'consumption', 'cost'
+    }
+    missing = required_headers - set(frame.columns)
+    if missing:
+        return OrjsonResponse({'error': f'Missing required columns: {", ".join(sorted(missing))}'}, status=400)
+
+    # The file is parsed on the request thread (it is closed once the request
+    # ends); validation and the database writes run on the upload queue.
+    return _queued_response(
+        f'upload:{uuid.uuid4().hex}',
+        lambda: _ingest_bills(frame, read_errors),
+        cacheable=lambda payload, status: False,
+        queue='upload',
+    )
@@ -32,4 +32,5 @@ urlpatterns = [
     path('api/bills/template/', views.download_template, name='download_template'),
     path('api/bills/upload/', views.upload_bills, name='upload_bills'),
     path('api/count/', views.count_bills, name='count_bills'),
+    path('api/jobs/<str:job_id>/', views.job_status, name='job_status'),
 ]
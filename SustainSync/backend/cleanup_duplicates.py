@@ -2,6 +2,8 @@
 """
 Cleanup duplicate bills with same bill_date (month/year) on system startup.
 Keeps the most recently uploaded bill when duplicates are detected.
+The uniq_bill_type_month constraint now rejects such duplicates on write, so
+this is a no-op safety check on a migrated database.
 """
 
 import os
@@ -13,8 +15,26 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 
-from django.db.models import Q, Count
-from SustainSync.models import Bill
+from django.db import connection, transaction
+from SustainSync.models import Bill, BillMonthlyTotals
+
+# Rank each (bill_type, month) group newest-first and drop everything but the
+# first row in one statement. bill_month is the indexed first-of-month copy of
+# bill_date, so this runs unchanged on PostgreSQL and SQLite.
+DELETE_DUPLICATES_SQL = """
+    DELETE FROM {table} WHERE bill_id IN (
+        SELECT bill_id FROM (
+            SELECT bill_id, ROW_NUMBER() OVER (
+                PARTITION BY bill_type, bill_month
+                ORDER BY timestamp_upload DESC NULLS LAST, bill_id DESC
+            ) AS rn
+            FROM {table}
+            WHERE bill_month IS NOT NULL
+        ) ranked
+        WHERE ranked.rn > 1
+    )
+    RETURNING bill_id, bill_type, bill_month
+"""
 
 
 def cleanup_duplicate_bills():
@@ -22,47 +42,22 @@ def cleanup_duplicate_bills():
     
     print("🔍 Checking for duplicate bills with same bill_date (month/year)...")
     
-    # Get all bill types
-    bill_types = Bill.objects.values_list('bill_type', flat=True).distinct()
+    table = connection.ops.quote_name(Bill._meta.db_table)
+    # The delete and the monthly totals refresh commit together.
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(DELETE_DUPLICATES_SQL.format(table=table))
+        deleted = cursor.fetchall()
+        if deleted:
+            BillMonthlyTotals.refresh()
     
-    total_deleted = 0
+    if deleted:
+        # One write for the whole report rather than a print per deleted bill.
+        print("\n".join(
+            f"      Deleted {bill_type} Bill #{bill_id} ({bill_month})"
+            for bill_id, bill_type, bill_month in sorted(deleted, key=lambda row: (row[1], str(row[2]), row[0]))
+        ))
     
-    for bill_type in bill_types:
-        print(f"\n📊 Processing {bill_type} bills...")
-        
-        # Find bills with same month/year/type
-        bills_by_month = Bill.objects.filter(
-            bill_type=bill_type,
-            bill_date__isnull=False
-        ).extra(select={
-            'year': "EXTRACT(YEAR FROM bill_date)",
-            'month': "EXTRACT(MONTH FROM bill_date)"
-        }).values('year', 'month').annotate(count=Count('bill_id')).filter(count__gt=1)
-        
-        for month_group in bills_by_month:
-            year = int(month_group['year'])
-            month = int(month_group['month'])
-            
-            # Get all bills for this month/year/type
-            duplicates = Bill.objects.filter(
-                bill_type=bill_type,
-                bill_date__year=year,
-                bill_date__month=month
-            ).order_by('-timestamp_upload', '-bill_id')
-            
-            if duplicates.count() > 1:
-                # Keep the first (newest), delete the rest
-                to_keep = duplicates.first()
-                to_delete = duplicates.exclude(bill_id=to_keep.bill_id)
-                
-                print(f"  ⚠️  Found {to_delete.count()} duplicate(s) for {year}/{month:02d}")
-                print(f"      Keeping Bill #{to_keep.bill_id} (uploaded {to_keep.timestamp_upload or to_keep.bill_date})")
-                
-                for bill in to_delete:
-                    print(f"      Deleting Bill #{bill.bill_id} (uploaded {bill.timestamp_upload or bill.bill_date})")
-                
-                deleted_count = to_delete.delete()[0]
-                total_deleted += deleted_count
+    total_deleted = len(deleted)
     
     if total_deleted > 0:
         print(f"\n✅ Cleanup complete! Removed {total_deleted} duplicate bill(s) total.")
@@ -2,26 +2,24 @@ import csv
 import os
 import django
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from django.db import connection, transaction
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
+from django.utils.dateparse import parse_date, parse_datetime
 
-# Setup Django environment
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
-django.setup()
+# Django is only set up by main(), so importing this module stays cheap; the
+# functions that touch models import them locally.
 
-from SustainSync.models import Bill
 
-# Resolve CSV path: prefer environment, then common filenames in the container-mounted /app/data
-CSV_PATH = os.environ.get('BILLS_CSV')
-if not CSV_PATH:
-    candidates = ['data/bills.csv', 'data/billdata.csv', 'data/bills.csv']
-    for c in candidates:
-        if os.path.exists(c):
-            CSV_PATH = c
-            break
-    if not CSV_PATH:
-        # default fallback
-        CSV_PATH = 'data/billdata.csv'
+def resolve_csv_path():
+    """Resolve CSV path: prefer environment, then common filenames in the container-mounted /app/data."""
+    path = os.environ.get('BILLS_CSV')
+    if path:
+        return path
+    candidates = ['data/bills.csv', 'data/billdata.csv']
+    # default fallback when neither exists
+    return next((c for c in candidates if os.path.exists(c)), 'data/billdata.csv')
 
 
 def parse_optional_float(value):
@@ -32,18 +30,19 @@ def parse_optional_float(value):
 
 
 def parse_optional_date(value):
-    """Parse date string and return as-is for DateField."""
+    """Parse a YYYY-MM-DD string into a date; the type/month de-duplication needs a real date."""
     try:
-        if not value:
-            return None
-        # let Django handle the string date parsing where appropriate; store as string if field is CharField
-        return value
-    except Exception:
+        return parse_date(value) if value else None
+    except ValueError:
         return None
 
 
+@lru_cache(maxsize=4096)
 def parse_optional_datetime(value):
-    """Parse datetime string and make it timezone-aware."""
+    """Parse datetime string and make it timezone-aware.
+
+    Cached because exports repeat the same upload timestamp across many rows.
+    """
     try:
         if not value:
             return None
@@ -62,28 +61,219 @@ def parse_optional_datetime(value):
         return None
 
 
-with open(CSV_PATH, newline='', encoding='utf-8') as csvfile:
-    reader = csv.DictReader(csvfile)
+# Rows per INSERT. PostgreSQL caps a statement at 65535 bound parameters, so with
+# 14 columns the hard ceiling is 65535 / (14 * 1.2 headroom) ~= 3900 rows; past
+# ~1000 rows per statement there is no measurable gain, hence the default.
+BATCH = int(os.environ.get("SUSTAINSYNC_BULK_BATCH_SIZE", "1000"))
+
+# Every column except the bill_id conflict target is overwritten on re-import.
+UPSERT_FIELDS = [
+    "bill_type", "timestamp_upload", "bill_date", "units_of_measure",
+    "consumption", "service_start", "service_end", "provider", "city", "state",
+    "zip", "cost", "file_source",
+]
+
+
+def column_index(header, name):
+    """Position of ``name`` in the CSV header, or None when the column is absent."""
+    try:
+        return header.index(name)
+    except ValueError:
+        return None
+
+
+def data_rows(reader):
+    """Rows after the header, skipping blank lines as csv.DictReader does."""
+    return (row for row in reader if row)
+
+
+def cell(row, index):
+    if index is None or index >= len(row):
+        return None
+    return row[index]
+
+
+def upload_rank(bill):
+    """Sort key for "newest upload wins": latest timestamp_upload (missing ones last), then highest bill_id."""
+    return (bill.timestamp_upload is not None, bill.timestamp_upload, bill.bill_id)
+
+
+def newest_per_month(owners):
+    """Resolve CSV bills against stored ones for the one-bill-per-type-and-month constraint.
+
+    ``owners`` maps (bill_type, bill_month) to the newest CSV bill for it.
+    Among CSV and stored bills for the same type and month the newest upload
+    wins; a stored bill whose CSV row moves it to another month no longer
+    counts for its old month, but counts again if that CSV row loses.
+    Returns the bills to write, the ids of stored bills they supersede and
+    the ids of stored bills that move to a new month.
+    """
+    from SustainSync.models import Bill
+
+    owners = dict(owners)
+    stored = [
+        bill for bill in Bill.objects.filter(
+            bill_type__in={bill_type for bill_type, _ in owners},
+            bill_month__in={month for _, month in owners},
+        ).only("bill_id", "bill_type", "bill_month", "timestamp_upload")
+        if (bill.bill_type, bill.bill_month) in owners
+    ]
+    stale = set()
+    resolved = False
+    while not resolved:
+        # Dropping a CSV bill puts its stored row back in play, so repeat until stable.
+        resolved = True
+        owner_ids = {bill.bill_id for bill in owners.values()}
+        for bill in stored:
+            key = (bill.bill_type, bill.bill_month)
+            if bill.bill_id in owner_ids or bill.bill_id in stale or key not in owners:
+                continue
+            if upload_rank(bill) > upload_rank(owners[key]):
+                del owners[key]
+                resolved = False
+                break
+            stale.add(bill.bill_id)
+
+    kept = list(owners.values())
+    new_keys = {bill.bill_id: key for key, bill in owners.items()}
+    moved = [
+        bill_id
+        for bill_id, bill_type, bill_month in Bill.objects.filter(
+            bill_id__in=list(new_keys), bill_month__isnull=False,
+        ).values_list("bill_id", "bill_type", "bill_month")
+        if (bill_type, bill_month) != new_keys[bill_id]
+    ]
+    return kept, sorted(stale), moved
+
+
+def read_bills(csvfile):
+    """Yield an unsaved Bill for each CSV row."""
+    from SustainSync.models import Bill
+
+    # csv.reader + positional lookups avoids allocating a dict per row.
+    reader = csv.reader(csvfile)
+    header = next(reader, [])
+    BILL_ID = column_index(header, "bill_id")
+    BILL_TYPE = column_index(header, "bill_type")
+    TIMESTAMP_UPLOAD = column_index(header, "timestamp_upload")
+    BILL_DATE = column_index(header, "bill_date")
+    UNITS_OF_MEASURE = column_index(header, "units_of_measure")
+    CONSUMPTION = column_index(header, "consumption")
+    SERVICE_START = column_index(header, "service_start")
+    SERVICE_END = column_index(header, "service_end")
+    PROVIDER = column_index(header, "provider")
+    CITY = column_index(header, "city")
+    STATE = column_index(header, "state")
+    ZIP = column_index(header, "zip")
+    COST = column_index(header, "cost")
+    FILE_SOURCE = column_index(header, "file_source")
+
+    for row in data_rows(reader):
+        bill_date = parse_optional_date(cell(row, BILL_DATE))
+        yield Bill(
+            bill_id=int(cell(row, BILL_ID)),
+            bill_type=cell(row, BILL_TYPE),
+            timestamp_upload=parse_optional_datetime(cell(row, TIMESTAMP_UPLOAD)),
+            bill_date=bill_date,
+            units_of_measure=cell(row, UNITS_OF_MEASURE),
+            consumption=parse_optional_float(cell(row, CONSUMPTION)),
+            service_start=parse_optional_date(cell(row, SERVICE_START)),
+            service_end=parse_optional_date(cell(row, SERVICE_END)),
+            provider=cell(row, PROVIDER),
+            city=cell(row, CITY),
+            state=cell(row, STATE),
+            zip=cell(row, ZIP),
+            cost=parse_optional_float(cell(row, COST)),
+            file_source=cell(row, FILE_SOURCE),
+        )
+
+
+def last_row_per_id(csvfile):
+    """Position of the last data row for each bill_id; a later row replaces earlier ones."""
+    reader = csv.reader(csvfile)
+    BILL_ID = column_index(next(reader, []), "bill_id")
+    return {int(cell(row, BILL_ID)): position for position, row in enumerate(data_rows(reader))}
+
+
+def write_bills(bills, batch_size):
+    """Upsert ``bills`` and return how many were written."""
+    from SustainSync import bulk
+    from SustainSync.models import Bill
+
+    if connection.vendor == "postgresql" and len(bills) >= bulk.COPY_THRESHOLD:
+        # Large writes skip the ORM: COPY into a staging table, then one upsert.
+        bulk.copy_upsert_bills(
+            {bill.bill_id: {name: getattr(bill, name) for name in UPSERT_FIELDS} for bill in bills},
+            update_fields=UPSERT_FIELDS,
+        )
+        return len(bills)
+    # One INSERT ... ON CONFLICT per chunk instead of a SELECT + write per row.
+    rows = iter(bills)
     count = 0
-    for row in reader:
-        Bill.objects.update_or_create(
-            bill_id=row.get("bill_id"),
-            defaults={
-                "bill_type": row.get("bill_type"),
-                "timestamp_upload": parse_optional_datetime(row.get("timestamp_upload")),
-                "bill_date": parse_optional_date(row.get("bill_date")),
-                "units_of_measure": row.get("units_of_measure"),
-                "consumption": parse_optional_float(row.get("consumption")),
-                "service_start": parse_optional_date(row.get("service_start")),
-                "service_end": parse_optional_date(row.get("service_end")),
-                "provider": row.get("provider"),
-                "city": row.get("city"),
-                "state": row.get("state"),
-                "zip": row.get("zip"),
-                "cost": parse_optional_float(row.get("cost")),
-                "file_source": row.get("file_source"),
-            },
+    while chunk := list(islice(rows, batch_size)):
+        Bill.objects.bulk_create(
+            chunk,
+            update_conflicts=True,
+            unique_fields=["bill_id"],
+            update_fields=UPSERT_FIELDS,
+            batch_size=batch_size,
         )
-        count += 1
+        count += len(chunk)
+    return count
+
+
+def import_bills(csv_path, batch_size=BATCH):
+    """Upsert every bill in ``csv_path`` and return how many were written.
+
+    The file is read twice so it never has to fit in memory: first for the
+    last row of each bill_id, then to build bills. Undated bills cannot clash
+    on the type/month constraint and are written in batches as they stream
+    past; dated ones are reduced to the newest per type and month, resolved
+    against stored bills and written last.
+    """
+    from SustainSync.models import Bill, BillMonthlyTotals
+
+    with open(csv_path, newline='', encoding='utf-8') as csvfile:
+        count = 0
+        with transaction.atomic():
+            last_rows = last_row_per_id(csvfile)
+            csvfile.seek(0)
+            owners = {}
+            undated = []
+            for position, bill in enumerate(read_bills(csvfile)):
+                if last_rows[bill.bill_id] != position:
+                    continue
+                if bill.bill_date is None:
+                    undated.append(bill)
+                    if len(undated) >= batch_size:
+                        count += write_bills(undated, batch_size)
+                        undated = []
+                    continue
+                key = (bill.bill_type, bill.bill_date.replace(day=1))
+                if key not in owners or upload_rank(bill) > upload_rank(owners[key]):
+                    owners[key] = bill
+            count += write_bills(undated, batch_size)
+
+            kept, stale, moved = newest_per_month(owners)
+            if stale:
+                Bill.objects.filter(bill_id__in=stale).delete()
+            if moved:
+                # Vacate the old months first (bill_month follows bill_date) so the
+                # upsert cannot collide with a bill's own stored row, whatever
+                # order the rows are written in.
+                Bill.objects.filter(bill_id__in=moved).update(bill_date=None)
+            count += write_bills(kept, batch_size)
+            BillMonthlyTotals.refresh()
+    return count
+
+
+def main():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    django.setup()
+    csv_path = resolve_csv_path()
+    count = import_bills(csv_path)
+    print(f"\u2705 Successfully imported {count} bills from {csv_path}.")
+
 
-print(f"\u2705 Successfully imported {count} bills from {CSV_PATH}.")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Caches for ``rag.run_query``.
+
+``SemanticCache`` compares questions by cosine similarity of their sentence
+embeddings, so a rephrased question ("total water cost last year?" vs "what
+did water cost us last year") reuses an earlier answer instead of calling the
+LLM again. Embeddings barely move when only a year, month or utility changes,
+so a cached answer is only considered when the question names exactly the
+same numbers, months, periods and utilities. Entries are tied to a data
+version and dropped as soon as it changes.
+
+``QueryCache`` remembers the embedding and retrieved context of exact
+(normalised) repeats, so dashboard refreshes skip the encoder and the FAISS
+search altogether.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+SIMILARITY_THRESHOLD = float(os.environ.get('RAG_CACHE_SIMILARITY', '0.92'))
+MAX_ENTRIES = int(os.environ.get('RAG_CACHE_MAX_ENTRIES', '256'))
+QUERY_CACHE_SIZE = int(os.environ.get('RAG_QUERY_CACHE_SIZE', '512'))
+QUERY_CACHE_TTL_SECONDS = float(os.environ.get('RAG_QUERY_CACHE_TTL_SECONDS', '300'))
+
+
+_NUMBER_RE = re.compile(r'\d+(?:[.,:/-]\d+)*')
+_WORD_RE = re.compile(r'[a-z]+')
+
+# Words that change which bills a question is about, folded to one token per
+# meaning. Questions whose tokens differ never share a cached answer.
+_SCOPE_TOKENS = {
+    **{name: f'month:{number}' for number, names in enumerate([
+        ('jan', 'january'), ('feb', 'february'), ('mar', 'march'), ('apr', 'april'),
+        ('may',), ('jun', 'june'), ('jul', 'july'), ('aug', 'august'),
+        ('sep', 'sept', 'september'), ('oct', 'october'), ('nov', 'november'), ('dec', 'december'),
+    ], start=1) for name in names},
+    **dict.fromkeys(('power', 'electric', 'electricity', 'kwh'), 'utility:power'),
+    **dict.fromkeys(('gas', 'therm', 'therms'), 'utility:gas'),
+    **dict.fromkeys(('water', 'gallon', 'gallons'), 'utility:water'),
+    'ccf': 'unit:ccf',
+    **{word: f'period:{word}' for word in (
+        'last', 'this', 'next', 'previous', 'current', 'past', 'ytd', 'today', 'yesterday',
+        'week', 'month', 'quarter', 'year', 'winter', 'spring', 'summer', 'fall', 'autumn',
+    )},
+}
+
+
+def scope_tokens(question):
+    """Numbers, months, periods and utilities named in ``question``, as a frozenset."""
+    text = question.lower()
+    tokens = {f'number:{number}' for number in _NUMBER_RE.findall(text)}
+    tokens.update(_SCOPE_TOKENS[word] for word in _WORD_RE.findall(text) if word in _SCOPE_TOKENS)
+    return frozenset(tokens)
+
+
+class SemanticCache:
+    """Thread-safe store of ``(unit embedding, scope tokens, answer)`` entries for one data version."""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version = None
+        self._vectors = None
+        self._scopes = []
+        self._answers = []
+
+    @staticmethod
+    def _unit(embedding):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def get(self, question, embedding, version):
+        """Return the answer of the most similar cached question with the same scope, or ``None``."""
+        query = self._unit(embedding)
+        scope = scope_tokens(question)
+        with self._lock:
+            if version != self._version:
+                return None
+            candidates = [position for position, other in enumerate(self._scopes) if other == scope]
+            if not candidates:
+                return None
+            scores = self._vectors[candidates] @ query
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                return self._answers[candidates[best]]
+        return None
+
+    def put(self, question, embedding, answer, version):
+        """Remember ``answer`` for ``question``, evicting the oldest entries past the cap."""
+        vector = self._unit(embedding)[np.newaxis, :]
+        scope = scope_tokens(question)
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._vectors = None
+                self._scopes = []
+                self._answers = []
+            self._vectors = vector if self._vectors is None else np.vstack([self._vectors, vector])
+            self._scopes.append(scope)
+            self._answers.append(answer)
+            if len(self._answers) > self.max_entries:
+                self._vectors = self._vectors[-self.max_entries:]
+                self._scopes = self._scopes[-self.max_entries:]
+                self._answers = self._answers[-self.max_entries:]
+
+
+class QueryCache:
+    """Thread-safe LRU with per-entry TTL, keyed by the normalised query text."""
+
+    def __init__(self, max_size=QUERY_CACHE_SIZE, ttl_seconds=QUERY_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(query):
+        normalised = ' '.join(query.lower().split())
+        return hashlib.blake2b(normalised.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, query):
+        """Return the value stored for ``query``, or ``None`` when absent or expired."""
+        key = self._key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def put(self, query, value):
+        key = self._key(query)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry; call when the index or dataset is rebuilt."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -37,7 +37,9 @@ Example use cases:
 """
 
 import os
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 import faiss
@@ -95,6 +97,8 @@ except Exception:
     pass
 
 from sentence_transformers import SentenceTransformer
+
+from .qcache import QueryCache, SemanticCache
 # Ollama client: optional. We prefer to lazily initialize the client at
 # call-time so the web process can start before Ollama is ready. This
 # avoids import-time connection failures when Ollama is started later.
@@ -155,8 +159,19 @@ def _init_ollama_client_if_needed():
         _OLLAMA_AVAILABLE = False
 
 DATA_PATH = None
+# Answers to earlier run_query questions, matched by embedding similarity within the same scope.
+answer_cache = SemanticCache()
+# Embedding and retrieved context of recent questions, for exact repeats.
+retrieval_cache = QueryCache()
+# Per-utility LLM summaries are requested in parallel; match Ollama's OLLAMA_NUM_PARALLEL.
+LLM_SUMMARY_CONCURRENCY = max(1, int(os.environ.get('OLLAMA_NUM_PARALLEL', '4')))
 INDEX_PATH = 'data/bill_index.faiss'
 MODEL_NAME = 'all-MiniLM-L6-v2'
+# Corpora at least this large get an approximate IVF+PQ index; smaller ones
+# are scanned in full, where a flat scan is already fast.
+ANN_MIN_VECTORS = int(os.environ.get('RAG_ANN_MIN_VECTORS', '10000'))
+# Inverted lists probed per query on IVF indexes (recall vs latency).
+ANN_NPROBE = int(os.environ.get('RAG_ANN_NPROBE', '8'))
 
 print("🔧 Initializing Bill Analysis Assistant...")
 logger = logging.getLogger(__name__)
@@ -212,10 +227,14 @@ def load_data():
         if c not in df.columns:
             df[c] = pd.NA
 
-    # Generate per-row summary (defensive access using get-like semantics)
-    df['summary'] = df.apply(lambda r:
-        f"{r.get('bill_date','')} {r.get('bill_type','')} in {r.get('city','')}, {r.get('state','')} "
-        f"consumed {r.get('consumption',0)} {r.get('units_of_measure','')} costing ${r.get('cost',0)}", axis=1)
+    # Generate per-row summary with column-wise string concatenation instead
+    # of a row-wise apply. map(str) renders values (None included) exactly as
+    # the f-string did; astype(str) keeps missing values as NaN on newer pandas.
+    text = {column: df[column].map(str) for column in expected_cols}
+    df['summary'] = (
+        text['bill_date'] + ' ' + text['bill_type'] + ' in ' + text['city'] + ', ' + text['state']
+        + ' consumed ' + text['consumption'] + ' ' + text['units_of_measure'] + ' costing $' + text['cost']
+    )
 
     # Generate yearly summaries
     df['year'] = pd.to_datetime(df['bill_date']).dt.year
@@ -224,9 +243,12 @@ def load_data():
         total_usage=('consumption', 'sum'),
     ).reset_index()
 
-    yearly['summary'] = yearly.apply(lambda r:
-        f"In {r['year']}, {r['bill_type']} total usage was {r['total_usage']:.2f} "
-        f"and total cost was ${r['total_cost']:.2f}", axis=1)
+    two_places = '{:.2f}'.format
+    yearly['summary'] = (
+        'In ' + yearly['year'].map(str) + ', ' + yearly['bill_type'].map(str)
+        + ' total usage was ' + yearly['total_usage'].map(two_places)
+        + ' and total cost was $' + yearly['total_cost'].map(two_places)
+    )
 
     # Combine detailed + yearly summaries
     combined = pd.concat([df[['summary']], yearly[['summary']]])
@@ -245,20 +267,49 @@ def load_data():
 def build_index(df, model):
     if os.path.exists(INDEX_PATH):
         print("📦 Loading existing FAISS index...")
-        return faiss.read_index(INDEX_PATH)
+        # Map IVF inverted lists from the file instead of copying them onto
+        # the heap; pages load on first search. Flat indexes ignore the flag.
+        return _set_nprobe(faiss.read_index(INDEX_PATH, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY))
     print("⚙️ Building FAISS index...")
     emb = model.encode(df['summary'].tolist(), batch_size=64, convert_to_numpy=True, show_progress_bar=True)
-    index = faiss.IndexFlatL2(emb.shape[1])
+    index = _new_index(emb)
     index.add(emb)
     faiss.write_index(index, INDEX_PATH)
     print("✅ Index built and cached.")
+    return _set_nprobe(index)
+
+
+def _new_index(emb):
+    """Flat fp16 index for small corpora, trained OPQ+IVF+PQ for large ones."""
+    n, d = emb.shape
+    if n < ANN_MIN_VECTORS:
+        # Half-precision codes halve the bytes each full scan reads; the
+        # rounding is far below what changes nearest-neighbour order here.
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+        index.train(emb)
+        return index
+    # nlist ~ 4*sqrt(N) per the Faiss guidelines; OPQ rotates to 64 dims and
+    # PQ16 stores each vector in 16 bytes.
+    nlist = int(4 * np.sqrt(n))
+    index = faiss.index_factory(d, f"OPQ16_64,IVF{nlist},PQ16")
+    index.train(emb)
+    return index
+
+
+def _set_nprobe(index):
+    try:
+        faiss.extract_index_ivf(index).nprobe = ANN_NPROBE
+    except RuntimeError:
+        pass  # flat index: nothing to tune
     return index
 
 # 3. Retrieve relevant context
-def retrieve(query, model, df, index, k=10):
-    q_emb = model.encode([query], convert_to_numpy=True)
+def retrieve(query, model, df, index, k=10, q_emb=None):
+    if q_emb is None:
+        q_emb = model.encode([query], convert_to_numpy=True)
     D, I = index.search(q_emb, k)
-    return [df.iloc[i]['summary'] for i in I[0]]
+    # IVF search pads with -1 when the probed lists hold fewer than k vectors.
+    return [df.iloc[i]['summary'] for i in I[0] if i >= 0]
 
 def compute_metrics_hint(df):
     # Expect df already loaded by caller to avoid repeated file reads.
@@ -292,6 +343,28 @@ def compute_metrics_hint(df):
     return "Recent sustainability summary: " + " ".join(hint)
 
 
+_metrics_hint_cache = None
+
+
+def _metrics_hint():
+    """compute_metrics_hint for the loaded raw_df, recomputed only when raw_df is replaced."""
+    global _metrics_hint_cache
+    source = raw_df
+    if _metrics_hint_cache is None or _metrics_hint_cache[0] is not source:
+        hint = compute_metrics_hint(source if source is not None else pd.DataFrame())
+        _metrics_hint_cache = (source, hint)
+    return _metrics_hint_cache[1]
+
+
+# One pooled session for every Ollama request, with retry logic for transient
+# errors; sized so parallel summary requests don't open throwaway connections.
+_ollama_session = requests.Session()
+_ollama_session.mount('http://', HTTPAdapter(
+    pool_maxsize=max(10, LLM_SUMMARY_CONCURRENCY),
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
+
 # 4. LLM query with configurable model support
 def ask_llm(context, question, model_name=None):
     """Query LLM with optional model selection.
@@ -337,8 +410,7 @@ def ask_llm(context, question, model_name=None):
         # If resources couldn't be initialized, proceed with empty hint
         hint = ""
     else:
-        source = raw_df if raw_df is not None else pd.DataFrame()
-        hint = compute_metrics_hint(source)
+        hint = _metrics_hint()
 
     prompt = f"{preamble}{hint}\n\nContext:\n{context}\n\nQuestion:\n{question}\n\nAnswer with specific trends and comparisons."
 
@@ -360,39 +432,38 @@ def ask_llm(context, question, model_name=None):
         payload = {
             'model': selected_model,
             'prompt': prompt,
-            'stream': False,
+            'stream': True,
         }
         
         logger.info(f"Using model '{selected_model}' for {'insights' if model_name == 'insights' else 'recommendations' if model_name == 'recommendations' else 'general query'}")
 
-        # Prepare a requests session with retry logic for transient errors
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-        session.mount('http://', HTTPAdapter(max_retries=retries))
-
         logger.info("Posting prompt to Ollama HTTP API %s (model=%s)", url, payload['model'])
-        r = session.post(url, json=payload, timeout=60)
+        # Streaming keeps tokens flowing, so the 60s read timeout bounds the
+        # gap between tokens rather than the whole generation.
+        r = _ollama_session.post(url, json=payload, timeout=60, stream=True)
         logger.info("Ollama response status: %s", r.status_code)
-        # Log response body at debug level (may contain large text)
-        try:
-            logger.debug("Ollama response body: %s", r.text)
-        except Exception:
-            logger.debug("Ollama response body could not be logged as text")
 
         if r.status_code == 200:
             try:
-                body = r.json()
-                # Ollama native API returns 'response' field with generated text
-                if 'response' in body:
-                    response_text = body['response']
-                    logger.info("Successfully extracted response text (length: %d chars)", len(response_text))
-                    return response_text
-                # fallback: return full JSON as string
-                logger.warning("Ollama 200 response did not contain 'response' key. Keys present: %s", list(body.keys()))
-                return str(body)
+                # Ollama streams one JSON object per line, each carrying the
+                # next fragment in its 'response' field.
+                parts = []
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if 'error' in chunk:
+                        raise ValueError(chunk['error'])
+                    parts.append(chunk.get('response', ''))
+                    if chunk.get('done'):
+                        break
+                response_text = ''.join(parts)
+                logger.info("Successfully extracted response text (length: %d chars)", len(response_text))
+                return response_text
             except Exception as e:
-                logger.exception("Failed to parse Ollama JSON response: %s", str(e))
-                return r.text
+                logger.exception("Failed to read Ollama streamed response: %s", str(e))
+            finally:
+                r.close()
         else:
             logger.warning("Non-200 response from Ollama: %s - %s", r.status_code, r.text[:1000])
     except Exception:
@@ -429,8 +500,7 @@ def ask_llm(context, question, model_name=None):
     # Use DB-backed data for metrics in the fallback as well
     try:
         ensure_resources()
-        metrics_source = raw_df if raw_df is not None else pd.DataFrame()
-        metrics = compute_metrics_hint(metrics_source)
+        metrics = _metrics_hint()
     except Exception:
         metrics = ""
     ctx_excerpt = (context[:2000] + '...') if len(context) > 2000 else context
@@ -441,6 +511,41 @@ def ask_llm(context, question, model_name=None):
     )
     return fallback
 
+def _monthly_totals(df):
+    """Sum cost and consumption per calendar month with ``np.bincount``.
+
+    Matches ``groupby(pd.Grouper(key='bill_date', freq='ME'))``: rows are
+    labelled by month end and months without bills appear with zero totals.
+    Expects ``df`` to have no missing ``bill_date`` values.
+    """
+    months = pd.to_datetime(df['bill_date']).to_numpy().astype('datetime64[M]').astype(np.int64)
+    first = months.min()
+    codes = months - first
+    size = int(codes.max()) + 1
+    cost = np.nan_to_num(pd.to_numeric(df['cost'], errors='coerce').to_numpy(dtype=float))
+    usage = np.nan_to_num(pd.to_numeric(df['consumption'], errors='coerce').to_numpy(dtype=float))
+    month_starts = pd.DatetimeIndex(np.arange(first, first + size).astype('datetime64[M]'))
+    return pd.DataFrame({
+        'bill_date': month_starts + pd.offsets.MonthEnd(0),
+        'cost': np.bincount(codes, weights=cost, minlength=size),
+        'consumption': np.bincount(codes, weights=usage, minlength=size),
+    })
+
+
+def _linear_fit(x, Y):
+    """Least-squares slope and intercept of every column of ``Y`` against ``x``.
+
+    Closed form of ``np.polyfit(x, y, 1)``, which would build a Vandermonde
+    matrix and run an SVD per column; callers pass at least two distinct x.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    Y = np.asarray(Y, dtype=np.float64)
+    dx = x - x.mean()
+    means = Y.mean(axis=0)
+    slopes = dx @ (Y - means) / (dx @ dx)
+    return slopes, means - slopes * x.mean()
+
+
 def _prepare_monthly_timeseries(df):
     """Aggregate a raw bill DataFrame into a monthly cost/usage time-series."""
 
@@ -454,13 +559,7 @@ def _prepare_monthly_timeseries(df):
     if ts.empty:
         raise ValueError('Billing data does not contain any cost values for forecasting')
 
-    ts['bill_date'] = pd.to_datetime(ts['bill_date'])
-    ts = (
-        ts.groupby(pd.Grouper(key='bill_date', freq='ME'))
-        .agg(cost=('cost', 'sum'), consumption=('consumption', 'sum'))
-        .reset_index()
-    )
-    ts = ts.sort_values('bill_date')
+    ts = _monthly_totals(ts)
 
     if len(ts) < 3:
         raise ValueError('At least three months of data are required for forecasting')
@@ -485,19 +584,17 @@ def _forecast_from_series(ts, periods=12):
     try:
         from prophet import Prophet
 
-        # Forecast cost
-        prophet_df_cost = ts.rename(columns={'bill_date': 'ds', 'cost': 'y'})
-        model_cost = Prophet(seasonality_mode='additive', yearly_seasonality=True)
-        model_cost.fit(prophet_df_cost)
-        future = model_cost.make_future_dataframe(periods=periods, freq='ME')
-        forecast_cost = model_cost.predict(future)
+        def fit(value_column):
+            model = Prophet(seasonality_mode='additive', yearly_seasonality=True)
+            return model.fit(ts.rename(columns={'bill_date': 'ds', value_column: 'y'}))
+
+        # Cost and usage models are independent; Stan optimises in a separate
+        # process, so fitting and predicting them on two threads overlaps.
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            model_cost, model_usage = pool.map(fit, ['cost', 'consumption'])
+            future = model_cost.make_future_dataframe(periods=periods, freq='ME')
+            forecast_cost, forecast_usage = pool.map(lambda model: model.predict(future), [model_cost, model_usage])
         tail_cost = forecast_cost.tail(periods)
-        
-        # Forecast consumption/usage
-        prophet_df_usage = ts.rename(columns={'bill_date': 'ds', 'consumption': 'y'})
-        model_usage = Prophet(seasonality_mode='additive', yearly_seasonality=True)
-        model_usage.fit(prophet_df_usage)
-        forecast_usage = model_usage.predict(future)
         tail_usage = forecast_usage.tail(periods)
         
         prophet_forecast = [
@@ -524,23 +621,17 @@ def _forecast_from_series(ts, periods=12):
 
     # Fallback to a lightweight linear trend when Prophet is unavailable.
     ts = ts.reset_index(drop=True)
-    ts['month_index'] = np.arange(len(ts))
-    
-    # Forecast cost
-    coeffs_cost = np.polyfit(ts['month_index'], ts['cost'], 1)
-    slope_cost, intercept_cost = coeffs_cost
-    
-    # Forecast usage/consumption
-    coeffs_usage = np.polyfit(ts['month_index'], ts['consumption'].fillna(0), 1)
-    slope_usage, intercept_usage = coeffs_usage
-    
+    slopes, intercepts = _linear_fit(
+        np.arange(len(ts)),
+        np.column_stack([ts['cost'], ts['consumption'].fillna(0)]),
+    )
+
     future_index = np.arange(len(ts), len(ts) + periods)
     last_date = ts['bill_date'].max()
     future_dates = pd.date_range(last_date + pd.offsets.MonthEnd(1), periods=periods, freq='M')
+    predictions = np.outer(future_index, slopes) + intercepts
     fallback_series = []
-    for idx, date in zip(future_index, future_dates):
-        pred_cost = slope_cost * idx + intercept_cost
-        pred_usage = slope_usage * idx + intercept_usage
+    for (pred_cost, pred_usage), date in zip(predictions, future_dates):
         fallback_series.append({
             'date': date.date().isoformat(),
             'yhat': float(pred_cost),
@@ -579,13 +670,7 @@ def _build_usage_context(df, forecast_result, label):
         fallback = f"• No {label_name.lower()} billing dates recorded yet."
         return "", fallback
 
-    df['bill_date'] = pd.to_datetime(df['bill_date'])
-    monthly = (
-        df.groupby(pd.Grouper(key='bill_date', freq='ME'))
-        .agg(cost=('cost', 'sum'), consumption=('consumption', 'sum'))
-        .reset_index()
-        .sort_values('bill_date')
-    )
+    monthly = _monthly_totals(df)
 
     if monthly.empty:
         fallback = f"• {label_name} billing records are missing cost values."
@@ -872,18 +957,17 @@ def forecast_trend_with_breakdown(bills_df, periods=12, include_summaries=False,
             breakdown.append({'bill_type': bill_type, 'error': str(exc)})
 
     summaries = {}
+    # LLM summary requests keyed by summary name; issued concurrently below.
+    llm_requests = {}
     context, fallback = _build_usage_context(bills_df, total_forecast, 'total')
     if include_summaries:
         if use_dashboard_format:
             # Dashboard format: single summary
-            summaries['total'] = _summarize_usage_with_llm('total', context, fallback, goals=goals, use_dashboard_format=True)
+            llm_requests['total'] = ('total', context, fallback, dict(use_dashboard_format=True))
         else:
             # Sustainability format: generate all three analysis types
-            summaries['total_goals'] = _summarize_usage_with_llm('total', context, fallback, goals=goals, use_dashboard_format=False, analysis_type='goals')
-            summaries['total_cobenefit'] = _summarize_usage_with_llm('total', context, fallback, goals=goals, use_dashboard_format=False, analysis_type='co-benefit')
-            summaries['total_environmental'] = _summarize_usage_with_llm('total', context, fallback, goals=goals, use_dashboard_format=False, analysis_type='environmental')
-            # Keep 'total' for backward compatibility (use goals type)
-            summaries['total'] = summaries['total_goals']
+            for key, analysis_type in (('total_goals', 'goals'), ('total_cobenefit', 'co-benefit'), ('total_environmental', 'environmental')):
+                llm_requests[key] = ('total', context, fallback, dict(use_dashboard_format=False, analysis_type=analysis_type))
     else:
         summaries['total'] = fallback
 
@@ -895,10 +979,22 @@ def forecast_trend_with_breakdown(bills_df, periods=12, include_summaries=False,
         subset = bills_df[bills_df['bill_type'] == bill_type]
         context, fallback = _build_usage_context(subset, entry, bill_type)
         if include_summaries:
-            summaries[bill_type] = _summarize_usage_with_llm(bill_type, context, fallback, goals=goals, use_dashboard_format=use_dashboard_format)
+            llm_requests[bill_type] = (bill_type, context, fallback, dict(use_dashboard_format=use_dashboard_format))
         else:
             summaries[bill_type] = fallback
 
+    if llm_requests:
+        with ThreadPoolExecutor(max_workers=min(LLM_SUMMARY_CONCURRENCY, len(llm_requests))) as pool:
+            futures = {
+                key: pool.submit(_summarize_usage_with_llm, label, context, fallback, goals=goals, **options)
+                for key, (label, context, fallback, options) in llm_requests.items()
+            }
+            for key, future in futures.items():
+                summaries[key] = future.result()
+        if not use_dashboard_format:
+            # Keep 'total' for backward compatibility (use goals type)
+            summaries['total'] = summaries['total_goals']
+
     combined = {**total_forecast, 'breakdown': breakdown, 'summaries': summaries}
     return combined
 
@@ -937,12 +1033,34 @@ def ensure_resources():
             index = None
 
 
-def run_query(question: str):
-    """Run general data analysis query using insights model."""
+def run_query(question: str, cache_version=None):
+    """Run general data analysis query using insights model.
+
+    When ``cache_version`` is given, answers are reused for semantically
+    similar questions asked against the same data version that name the
+    same numbers, months, periods and utilities.
+    """
     ensure_resources()
-    ctx = "\n".join(retrieve(question, model, df, index, k=10)) if df is not None and index is not None and model is not None else ""
+    q_emb = None
+    contexts = None
+    if model is not None:
+        hit = retrieval_cache.get(question)
+        if hit is not None:
+            q_emb, contexts = hit
+        else:
+            q_emb = model.encode([question], convert_to_numpy=True)
+        if cache_version is not None:
+            cached = answer_cache.get(question, q_emb[0], cache_version)
+            if cached is not None:
+                return cached
+    if contexts is None and df is not None and index is not None and model is not None:
+        contexts = retrieve(question, model, df, index, k=10, q_emb=q_emb)
+        retrieval_cache.put(question, (q_emb, contexts))
+    ctx = "\n".join(contexts) if contexts is not None else ""
     # Use insights model for general data queries
     ans = ask_llm(ctx, question, model_name='insights')
+    if q_emb is not None and cache_version is not None and not ans.startswith('(LLM unavailable)'):
+        answer_cache.put(question, q_emb[0], ans, cache_version)
     return ans
 
 
@@ -972,4 +1090,5 @@ def reload_data():
     global df, raw_df, index
     df = load_data()
     index = build_index(df, model) if model is not None else None
+    retrieval_cache.clear()
     return "Data reloaded."
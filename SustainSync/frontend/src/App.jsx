@@ -14,6 +14,7 @@ import {
   Stack,
 } from '@mui/material'
 import { theme } from './theme'
+import { fetchWithJobPolling } from './api'
 import brandLogo from './assets/brand-logo.svg'
 import Dashboard from './pages/Dashboard.jsx'
 import Tables from './pages/Tables.jsx'
@@ -71,8 +72,7 @@ function App() {
   // Fetch dashboard forecast data (Key Trends, Cost Efficiency, Actionable Recommendations)
   const fetchDashboardForecast = async () => {
     try {
-      const response = await fetch(`${API_BASE}/api/forecast/?periods=12&format=dashboard`)
-      const data = await response.json()
+      const { response, data } = await fetchWithJobPolling(`${API_BASE}/api/forecast/?periods=12&format=dashboard`)
       if (!response.ok) throw new Error(data.error || 'Unable to load forecast')
       setSharedData(prev => ({ ...prev, dashboardForecastData: data, loading: { ...prev.loading, dashboardForecast: false } }))
     } catch (error) {
@@ -83,8 +83,7 @@ function App() {
   // Fetch sustainability forecast data (goal-focused recommendations)
   const fetchSustainabilityForecast = async () => {
     try {
-      const response = await fetch(`${API_BASE}/api/forecast/?periods=12&format=sustainability`)
-      const data = await response.json()
+      const { response, data } = await fetchWithJobPolling(`${API_BASE}/api/forecast/?periods=12&format=sustainability`)
       if (!response.ok) throw new Error(data.error || 'Unable to load forecast')
       setSharedData(prev => ({ ...prev, sustainabilityForecastData: data, loading: { ...prev.loading, sustainabilityForecast: false } }))
     } catch (error) {
@@ -95,8 +94,7 @@ function App() {
   // Fetch recommendations
   const fetchRecommendations = async () => {
     try {
-      const response = await fetch(`${API_BASE}/api/recommendations/`)
-      const data = await response.json()
+      const { response, data } = await fetchWithJobPolling(`${API_BASE}/api/recommendations/`)
       if (!response.ok) throw new Error(data.error || data.warning || 'Unable to load recommendations')
       setSharedData(prev => ({
         ...prev,
@@ -1,4 +1,5 @@
 import { useState } from 'react'
+import { fetchWithJobPolling } from './api'
 
 export default function TestRag(){
   const [answer, setAnswer] = useState(null)
@@ -6,12 +7,11 @@ export default function TestRag(){
   const API_BASE = import.meta.env.VITE_API_BASE || 'http://localhost:8000'
 
   async function askQuestion(){
-  const res = await fetch(`${API_BASE}/ask/`, {
+  const { data } = await fetchWithJobPolling(`${API_BASE}/ask/`, {
       method: 'POST',
       headers: {'Content-Type':'application/json'},
       body: JSON.stringify({question: 'What is the total consumption trend?'}),
     })
-    const data = await res.json()
     setAnswer(data.answer || data.error)
   }
 
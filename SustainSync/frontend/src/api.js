@@ -0,0 +1,15 @@
+const API_BASE = import.meta.env.VITE_API_BASE || 'http://localhost:8000'
+const JOB_POLL_INTERVAL_MS = 2000
+
+// LLM-backed endpoints and CSV uploads answer 202 with a job id while the work
+// runs in the background; poll the job until it finishes and return the final response.
+export const fetchWithJobPolling = async (url, options) => {
+  let response = await fetch(url, options)
+  let data = await response.json()
+  while (response.status === 202 && data.job_id) {
+    await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+    response = await fetch(`${API_BASE}/api/jobs/${data.job_id}/`)
+    data = await response.json()
+  }
+  return { response, data }
+}
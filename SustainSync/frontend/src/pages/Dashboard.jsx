@@ -33,6 +33,7 @@ import CheckCircleIcon from '@mui/icons-material/CheckCircle'
 import ExpandMoreIcon from '@mui/icons-material/ExpandMore'
 import LightbulbIcon from '@mui/icons-material/Lightbulb'
 import SavingsIcon from '@mui/icons-material/Savings'
+import { fetchWithJobPolling } from '../api'
 
 const API_BASE = import.meta.env.VITE_API_BASE || 'http://localhost:8000'
 
@@ -731,11 +732,10 @@ function Dashboard({ forecastData = null, recommendations = '', recommendationSo
     setUploadResult({ status: 'uploading', filename: file.name })
 
     try {
-      const response = await fetch(`${API_BASE}/api/bills/upload/`, {
+      const { response, data } = await fetchWithJobPolling(`${API_BASE}/api/bills/upload/`, {
         method: 'POST',
         body: formData,
       })
-      const data = await response.json()
       if (!response.ok) throw new Error(data.error || 'Upload failed')
       
       // Show success briefly